@@ -1,14 +1,38 @@
 from .Qt.QtWidgets import QDialog
-from .Qt.QtCompat import loadUi
+from .Qt.QtCore import QTimer
+from .Qt.QtCompat import loadUi, isValid
 from .utils import getUiFile
-from .alignNodesLib import align, spread, distribute, getSelItems, xSetter, ySetter
+from .alignNodesLib import (
+    NodeEditorUI,
+    getPositionHistory,
+    snapshotPositions,
+    xSetter,
+    ySetter,
+)
 
 
 class AlignNodesDialog(QDialog):
+    # How long the sliders have to sit still before the preview updates
+    previewDelay = 30
+
     def __init__(self, parent=None):
         super(AlignNodesDialog, self).__init__(parent)
         loadUi(getUiFile(__file__), self)
 
+        # The node editor session is kept while its scene is current, so the
+        # selected items are only looked up when they change
+        self._nui = None
+        self._selItems = None
+
+        # Item positions from before the current slider preview started
+        self._preview = None
+        self._previewOp = None
+
+        self._previewTimer = QTimer(self)
+        self._previewTimer.setSingleShot(True)
+        self._previewTimer.setInterval(self.previewDelay)
+        self._previewTimer.timeout.connect(self.updatePreview)
+
         self.uiHorLeftBTN.clicked.connect(self.horLeft)
         self.uiHorCenterBTN.clicked.connect(self.horCenter)
         self.uiHorRightBTN.clicked.connect(self.horRight)
@@ -25,44 +49,142 @@ class AlignNodesDialog(QDialog):
         self.uiVerDistCenterBTN.clicked.connect(self.verDistributeCenter)
         self.uiVerDistBottomBTN.clicked.connect(self.verDistributeBottom)
 
+        self.uiTidyGridBTN.clicked.connect(self.tidyGrid)
+
+        self.uiSpacingSLD.valueChanged.connect(self.spacingChanged)
+        self.uiPercentSLD.valueChanged.connect(self.percentChanged)
+        self.uiSpacingSLD.sliderReleased.connect(self.commitPreview)
+        self.uiPercentSLD.sliderReleased.connect(self.commitPreview)
+        self.uiUndoBTN.clicked.connect(self.undo)
+
+    @property
+    def nui(self):
+        # The editor tab can change while the dialog is open, so check that the
+        # cached session is still on the scene the current view shows
+        current = NodeEditorUI()
+        if self._nui is not None and isValid(self._nui.scene):
+            if self._nui.scene is current.scene:
+                return self._nui
+            self._nui.scene.selectionChanged.disconnect(self.selectionChanged)
+
+        # Finish a preview on the old scene without updating it from the new one
+        self._previewTimer.stop()
+        self.commitPreview()
+        self._nui = current
+        self._nui.scene.selectionChanged.connect(self.selectionChanged)
+        self._selItems = None
+        return self._nui
+
+    def selectionChanged(self):
+        self.commitPreview()
+        self._selItems = None
+
+    def getSelItems(self):
+        if self._selItems is None:
+            self._selItems = self.nui.getSelItems()
+        return self._selItems
+
+    @staticmethod
+    def restore(snapshot):
+        for item, x, y in snapshot:
+            if isValid(item):
+                item.setPos(x, y)
+
+    def apply(self, func, *args):
+        """Run an operation on the selected items as one undoable step"""
+        self.commitPreview()
+        items = self.getSelItems()
+        if not items:
+            return
+        getPositionHistory().push(snapshotPositions(items))
+        func(items, *args)
+
+    def undo(self):
+        self.commitPreview()
+        getPositionHistory().undo(scene=self.nui.scene, view=self.nui.graphView)
+
+    def spacingChanged(self):
+        self._previewOp = "spread"
+        self._previewTimer.start()
+
+    def percentChanged(self):
+        self._previewOp = "align"
+        self._previewTimer.start()
+
+    def updatePreview(self):
+        """Put the selected items back where they started, and re-run the
+        slider operation on only those items
+        """
+        items = self.getSelItems()
+        if not items:
+            return
+        if self._preview is None:
+            self._preview = snapshotPositions(items)
+        else:
+            self.restore(self._preview)
+
+        setter = ySetter if self.uiAxisYRB.isChecked() else xSetter
+        if self._previewOp == "spread":
+            offset = float(self.uiSpacingSLD.value())
+            NodeEditorUI.spread(items, setter, offset=offset)
+        else:
+            NodeEditorUI.align(items, setter, self.uiPercentSLD.value() / 100.0)
+
+        # Clicks and key presses on the sliders don't have a release
+        if not (self.uiSpacingSLD.isSliderDown() or self.uiPercentSLD.isSliderDown()):
+            self.commitPreview()
+
+    def commitPreview(self):
+        """Finish the current slider preview as a single undo step"""
+        if self._previewTimer.isActive():
+            self._previewTimer.stop()
+            self.updatePreview()
+            return
+        if self._preview is not None:
+            getPositionHistory().push(self._preview)
+            self._preview = None
+
     def horLeft(self):
-        align(getSelItems(), xSetter, 0.0)
+        self.apply(NodeEditorUI.align, xSetter, 0.0)
 
     def horCenter(self):
-        align(getSelItems(), xSetter, 0.5)
+        self.apply(NodeEditorUI.align, xSetter, 0.5)
 
     def horRight(self):
-        align(getSelItems(), xSetter, 1.0)
+        self.apply(NodeEditorUI.align, xSetter, 1.0)
 
     def horSpread(self):
-        spread(getSelItems(), xSetter)
+        self.apply(NodeEditorUI.spread, xSetter)
 
     def horDistributeLeft(self):
-        distribute(getSelItems(), xSetter, 0.0)
+        self.apply(NodeEditorUI.distribute, xSetter, 0.0)
 
     def horDistributeCenter(self):
-        distribute(getSelItems(), xSetter, 0.5)
+        self.apply(NodeEditorUI.distribute, xSetter, 0.5)
 
     def horDistributeRight(self):
-        distribute(getSelItems(), xSetter, 1.0)
+        self.apply(NodeEditorUI.distribute, xSetter, 1.0)
 
     def verTop(self):
-        align(getSelItems(), ySetter, 0.0)
+        self.apply(NodeEditorUI.align, ySetter, 0.0)
 
     def verCenter(self):
-        align(getSelItems(), ySetter, 0.5)
+        self.apply(NodeEditorUI.align, ySetter, 0.5)
 
     def verBottom(self):
-        align(getSelItems(), ySetter, 1.0)
+        self.apply(NodeEditorUI.align, ySetter, 1.0)
 
     def verSpread(self):
-        spread(getSelItems(), ySetter)
+        self.apply(NodeEditorUI.spread, ySetter)
 
     def verDistributeTop(self):
-        distribute(getSelItems(), ySetter, 0.0)
+        self.apply(NodeEditorUI.distribute, ySetter, 0.0)
 
     def verDistributeCenter(self):
-        distribute(getSelItems(), ySetter, 0.5)
+        self.apply(NodeEditorUI.distribute, ySetter, 0.5)
 
     def verDistributeBottom(self):
-        distribute(getSelItems(), ySetter, 1.0)
+        self.apply(NodeEditorUI.distribute, ySetter, 1.0)
+
+    def tidyGrid(self):
+        self.apply(NodeEditorUI.tidyGrid)
@@ -1,17 +1,36 @@
-from maya import OpenMayaUI as mui, OpenMaya as om, cmds
-from PySide2.QtWidgets import (
-    QGraphicsItem,
-    QWidget,
-    QGraphicsView,
-    QStackedLayout,
-    QGraphicsSimpleTextItem,
-)
-
 from contextlib import contextmanager
-from shiboken2 import wrapInstance
 import sys
-import copy
 import re
+import time
+
+from .graph import Graph, SubtreeHasher
+from .layout import (
+    boundsArea,
+    boundsCenter,
+    compactRects,
+    forceDirected,
+    gridPositions,
+    layerBoxes,
+    mirrorAffine,
+    rotateAffine,
+    scaleAffine,
+    straightenLayers,
+    transformRects,
+    translateAffine,
+    transposeAffine,
+)
+from .metrics import layoutMetrics
+from .resolver import getResolver
+from .utils import lazyImport
+
+# Maya and Qt only get imported once something actually talks to the editor
+# so the layout code can be imported and run outside of Maya
+om = lazyImport("maya.OpenMaya")
+mui = lazyImport("maya.OpenMayaUI")
+cmds = lazyImport("maya.cmds")
+QtCore = lazyImport("PySide2.QtCore")
+QtWidgets = lazyImport("PySide2.QtWidgets")
+shiboken2 = lazyImport("shiboken2")
 
 if sys.version_info.major == 3:
     long = int
@@ -37,6 +56,29 @@ def _flatToTuples(flat, count=2):
     return list(zip(*[ff] * count))
 
 
+def _longPlugPairs(cnx):
+    """Pair up a flat listConnections(plugs=True, connections=True) result,
+    using the full names of the nodes
+
+    Only the node names go through ls. It drops repeats, so passing it the
+    plugs would lose a plug that shows up twice and shift every pair after it
+    """
+    if not cnx:
+        return []
+    nodes = sorted(set(p.split(".", 1)[0] for p in cnx))
+    longNames = dict(zip(nodes, cmds.ls(nodes, long=True)))
+    ret = []
+    for plug in cnx:
+        node, attr = plug.split(".", 1)
+        ret.append(longNames.get(node, node) + "." + attr)
+    return _flatToTuples(ret)
+
+
+def _topAttr(plug):
+    """Get the lowercase top-level attribute name of a "node.attr[0].child" plug"""
+    return plug.split(".", 2)[1].split("[", 1)[0].lower()
+
+
 def _dedup(items):
     memo = set()
     out = []
@@ -98,26 +140,443 @@ class ySetter(object):
         return [i.sceneBoundingRect().height() for i in items]
 
 
-class NodeEditorUI(object):
+class PlugGeometry(object):
+    """A cache of where each displayed top-level attribute row sits inside a node
+
+    Nodes of the same type that are shown the same way have their rows in the
+    same place, so the offsets are keyed by the node type, the names of the
+    rows shown, and the node height. The names tell apart nodes of one type
+    that show different attributes in the same number of rows, and the height
+    changes with the display mode and with compounds being expanded, so it
+    stands in for both of those
+    """
+
     def __init__(self):
+        self._cache = {}
+
+    def clear(self):
+        self._cache = {}
+
+    @staticmethod
+    def _getTree(node):
+        """Get the tree item and its model for a node, or (None, None)"""
+        # childItems should return the simpleText name item
+        # and the node's graphicsWidget tree if it exists
+        ci = node.childItems()
+        if len(ci) < 2:
+            return None, None
+        treeItem = ci[1]
+        # The first child of the tree is its model
+        return treeItem, treeItem.children()[0]
+
+    @staticmethod
+    def _rowNames(nodeModel):
+        """Get the attrName of each row shown, lowercase with no spaces"""
+        count = nodeModel.rowCount(nodeModel.index(-1, -1))
+        return tuple(
+            nodeModel.data(nodeModel.index(r, 0)).replace(" ", "").lower()
+            for r in range(count)
+        )
+
+    @classmethod
+    def key(cls, nodeType, node):
+        treeItem, nodeModel = cls._getTree(node)
+        rows = () if nodeModel is None else cls._rowNames(nodeModel)
+        return nodeType, rows, round(node.boundingRect().height(), 1)
+
+    @classmethod
+    def measure(cls, node):
+        """Walk the node's tree model once to get the local Y of each row
+
+        Returns:
+            dict: {attrName: localY} where attrName is lowercase with no spaces,
+                and localY is the row center relative to the top of the node
+        """
+        treeItem, nodeModel = cls._getTree(node)
+        if nodeModel is None:
+            return {}
+        names = cls._rowNames(nodeModel)
+        count = len(names)
+        if not count:
+            return {}
+
+        rect = treeItem.boundingRect()
+        top = treeItem.mapToItem(node, rect.topLeft()).y()
+        top -= node.boundingRect().top()
+
+        # Use the rows' size hints when the model gives them, otherwise
+        # split the tree evenly between the rows
+        heights = []
+        for r in range(count):
+            hint = nodeModel.data(nodeModel.index(r, 0), QtCore.Qt.SizeHintRole)
+            heights.append(hint.height() if hint is not None else None)
+        if None in heights or sum(heights) <= 0:
+            heights = [rect.height() / count] * count
+
+        ret = {}
+        y = top
+        for name, h in zip(names, heights):
+            ret[name] = y + h / 2.0
+            y += h
+        return ret
+
+    def getOffsets(self, nodeType, node):
+        """Get the {attrName: localY} dict for a node, measuring it if needed"""
+        key = self.key(nodeType, node)
+        ret = self._cache.get(key)
+        if ret is None:
+            ret = self.measure(node)
+            self._cache[key] = ret
+        return ret
+
+
+_PLUG_GEOMETRY = None
+
+
+def getPlugGeometry():
+    """Get the shared PlugGeometry cache"""
+    global _PLUG_GEOMETRY
+    if _PLUG_GEOMETRY is None:
+        _PLUG_GEOMETRY = PlugGeometry()
+    return _PLUG_GEOMETRY
+
+
+def queryIncomingPlugs(node):
+    """Ask maya for the plug-level connections coming into a node
+
+    Returns:
+        list: (dstPlug, srcPlug) pairs in the order maya lists them
+    """
+    cnx = cmds.listConnections(
+        node, destination=False, shapes=True, plugs=True, connections=True
+    )
+    return _longPlugPairs(cnx)
+
+
+def queryAliases(node):
+    """Ask maya for the attribute aliases of a node
+
+    Returns:
+        dict: {"node.alias": "node.attr"}
+    """
+    aliases = cmds.aliasAttr(node, query=True) or []
+    aliases = ["{0}.{1}".format(node, i) for i in aliases]
+    return dict(_flatToTuples(aliases))
+
+
+class DGCache(object):
+    """The incoming connections and aliases of nodes, queried from maya once
+    and shared by every editor that shows them
+
+    Laying out several editor tabs that show the same nodes would otherwise
+    query every shared node once per tab. The connection graph of all the
+    cached nodes is only rebuilt when new nodes are added, and each editor
+    gets its nodes' part of it
+    """
+
+    def __init__(self, nodeNames=()):
+        self._inputs = {}
+        self._aliases = {}
+        self._graph = None
+        self.add(nodeNames)
+
+    def __contains__(self, node):
+        return node in self._inputs
+
+    def add(self, nodeNames):
+        """Query the nodes that aren't cached yet"""
+        for n in nodeNames:
+            if n not in self._inputs:
+                self._inputs[n] = queryIncomingPlugs(n)
+                self._aliases[n] = queryAliases(n)
+                self._graph = None
+
+    @property
+    def graph(self):
+        """The connection graph of every cached node"""
+        if self._graph is None:
+            edges = []
+            for n, pairs in self._inputs.items():
+                edges.extend((s.split(".")[0], n) for d, s in pairs)
+            self._graph = Graph(self._inputs, edges)
+        return self._graph
+
+    def getGraph(self, nodeNames):
+        """Get the connection graph between the given nodes"""
+        nodeNames = set(nodeNames)
+        self.add(nodeNames)
+        graph = self.graph
+        return graph.subgraph(graph.toIds(nodeNames))
+
+    def getIncomingPlugs(self, node):
+        self.add([node])
+        return self._inputs[node]
+
+    def getAliases(self, node):
+        self.add([node])
+        return self._aliases[node]
+
+
+def getEditorPane(panel):
+    """Get the Qt widget of a node editor panel, or None if it isn't open"""
+    ctrl = mui.MQtUtil.findControl(panel + "NodeEditorEd")
+    if ctrl is None:
+        return None
+    return shiboken2.wrapInstance(int(ctrl), QtWidgets.QWidget)
+
+
+def setEditorTab(pane, index):
+    """Switch a node editor pane to a tab the same way clicking it does, so
+    maya's own queries like nodeEditor -getNodeList follow along
+
+    Returns:
+        bool: Whether the tab is now current
+    """
+    tabBar = pane.findChild(QtWidgets.QTabBar)
+    if tabBar is not None and index < tabBar.count():
+        tabBar.setCurrentIndex(index)
+    return pane.findChild(QtWidgets.QStackedLayout).currentIndex() == index
+
+
+def snapshotPositions(items):
+    """Get the (item, x, y) of each given item, for PositionHistory"""
+    return [(i, i.pos().x(), i.pos().y()) for i in items]
+
+
+class PositionHistory(object):
+    """An undo stack of item positions
+
+    Moving the node editor's Qt items doesn't go on maya's undo queue, so each
+    entry here is a list of (item, x, y) to put back, and a whole layout or
+    align is a single entry
+    """
+
+    def __init__(self):
+        self._stack = []
+
+    def __len__(self):
+        return len(self._stack)
+
+    def clear(self):
+        self._stack = []
+
+    def push(self, snapshot, merge=False):
+        """Add an undo entry
+
+        Arguments:
+            snapshot (list): The (item, x, y) to put back
+            merge (bool): Add the snapshot to the last entry instead, so both
+                are undone together. Items already in that entry keep their
+                older position
+        """
+        if not snapshot:
+            return
+        if merge and self._stack:
+            last = self._stack[-1]
+            seen = set(item for item, x, y in last)
+            last.extend(s for s in snapshot if s[0] not in seen)
+        else:
+            self._stack.append(list(snapshot))
+
+    def undo(self, scene=None, view=None):
+        """Put the items of the last entry back where they were
+
+        Arguments:
+            scene (QGraphicsScene, optional): The scene of the items. When given
+                the items are moved a chunk at a time. See PositionApplier
+            view (QGraphicsView, optional): See PositionApplier
+
+        Returns:
+            bool: Whether there was anything to undo
+        """
+        finishAppliers()
+        if not self._stack:
+            return False
+        moves = self._stack.pop()
+        if scene is None:
+            for item, x, y in moves:
+                if shiboken2.isValid(item):
+                    item.setPos(x, y)
+        else:
+            PositionApplier(scene, moves, view=view).start()
+        return True
+
+
+_POSITION_HISTORY = None
+
+
+def getPositionHistory():
+    """Get the shared PositionHistory"""
+    global _POSITION_HISTORY
+    if _POSITION_HISTORY is None:
+        _POSITION_HISTORY = PositionHistory()
+    return _POSITION_HISTORY
+
+
+# The appliers that are still running. Holding them here keeps their timers
+# alive after the NodeEditorUI that started them is gone
+_APPLIERS = []
+
+
+def finishAppliers():
+    """Finish applying every position change that's still running"""
+    for applier in list(_APPLIERS):
+        applier.finish()
+
+
+class PositionApplier(object):
+    """Move a lot of node editor items without freezing the editor
+
+    The items are moved a chunk at a time from a QTimer, starting with the
+    ones in view. While the moves run the scene's item index is turned off,
+    so the scene doesn't re-index after every single move, and it's turned
+    back on once at the end
+
+    Arguments:
+        scene (QGraphicsScene): The scene the items are in
+        moves (list): (item, x, y) of each item to move
+        view (QGraphicsView, optional): Items inside this view are moved first
+        history (PositionHistory, optional): When all the moves are done,
+            push where the items started as a single undo entry
+        merge (bool): Add where the items started to the last undo entry
+            instead of pushing a new one
+    """
+
+    # Seconds of moves to do before handing control back to the event loop
+    chunkTime = 0.01
+    # Don't bother with the timer for fewer moves than this
+    minChunked = 500
+
+    def __init__(self, scene, moves, view=None, history=None, merge=False):
+        self._scene = scene
+        self._view = view
+        self._moves = list(moves)
+        self._history = history
+        self._merge = merge
+        self._before = None
+        self._indexMethod = None
+        self._timer = None
+        self._pos = 0
+
+    def isActive(self):
+        return self._timer is not None
+
+    def _visibleFirst(self):
+        """Sort the moves so the items that are in view, or that are moving
+        into view, come first
+        """
+        viewport = self._view.viewport()
+        visible = self._view.mapToScene(viewport.rect()).boundingRect()
+        inView, outView = [], []
+        for move in self._moves:
+            item, x, y = move
+            if not shiboken2.isValid(item):
+                outView.append(move)
+                continue
+            r = item.sceneBoundingRect()
+            target = r.translated(x - item.pos().x(), y - item.pos().y())
+            if visible.intersects(r) or visible.intersects(target):
+                inView.append(move)
+            else:
+                outView.append(move)
+        self._moves = inView + outView
+
+    def start(self):
+        """Start moving the items. Any earlier moves that are still running
+        get finished first
+        """
+        finishAppliers()
+        items = [item for item, x, y in self._moves]
+        self._before = snapshotPositions(items) if self._history else None
+        app = QtWidgets.QApplication.instance()
+        if len(self._moves) < self.minChunked or app is None:
+            self._step(None)
+            self._finish()
+            return
+
+        if self._view is not None and shiboken2.isValid(self._view):
+            self._visibleFirst()
+        self._indexMethod = self._scene.itemIndexMethod()
+        self._scene.setItemIndexMethod(QtWidgets.QGraphicsScene.NoIndex)
+        self._timer = QtCore.QTimer()
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._tick)
+        _APPLIERS.append(self)
+        self._timer.start()
+
+    def _step(self, deadline):
+        """Do moves until they run out, or until the deadline passes"""
+        moves = self._moves
+        count = len(moves)
+        while self._pos < count:
+            stop = min(self._pos + 64, count)
+            for item, x, y in moves[self._pos : stop]:
+                if shiboken2.isValid(item):
+                    item.setPos(x, y)
+            self._pos = stop
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+    def _tick(self):
+        if not shiboken2.isValid(self._scene):
+            self._moves = []
+            self._finish()
+            return
+        self._step(time.perf_counter() + self.chunkTime)
+        if self._pos >= len(self._moves):
+            self._finish()
+
+    def finish(self):
+        """Do all the remaining moves right now"""
+        if self._timer is None:
+            return
+        if shiboken2.isValid(self._scene):
+            self._step(None)
+        self._finish()
+
+    def _finish(self):
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+            if self in _APPLIERS:
+                _APPLIERS.remove(self)
+            if self._indexMethod is not None and shiboken2.isValid(self._scene):
+                self._scene.setItemIndexMethod(self._indexMethod)
+        if self._history is not None:
+            self._history.push(self._before, merge=self._merge)
+
+
+class NodeEditorUI(object):
+    hSpacing = 100
+    vSpacing = 50
+
+    def __init__(self, panel=None, dgCache=None):
+        """
+        Arguments:
+            panel (str, optional): The node editor panel to work in. Defaults
+                to the first one. The editor uses whichever tab of the panel is
+                current the first time it's looked up
+            dgCache (DGCache, optional): Read the connections from this shared
+                cache instead of asking maya for each editor
+        """
+        self._panel = panel
+        self.dgCache = dgCache
         self._graphView = None
         self._scene = None
         self._name = None
-        self._ups = None
-        self._fullUps = None
-        self._downs = None
-        self._fullDowns = None
-        self._cycles = None
+        self._graph = None
+        self._nodeObjects = None
+        # The summed (before, after) bounding areas of compacted layouts
+        self.compaction = None
 
     def _getCurrentView(self):
-        pan = cmds.getPanel(scriptType="nodeEditorPanel")[0]
+        pan = self._panel or cmds.getPanel(scriptType="nodeEditorPanel")[0]
         self._name = pan + "NodeEditorEd"
-        ctrl = mui.MQtUtil.findControl(self._name)
-        if ctrl is None:
+        nodeEdPane = getEditorPane(pan)
+        if nodeEdPane is None:
             raise RuntimeError("Node editor is not open")
-        nodeEdPane = wrapInstance(int(ctrl), QWidget)
-        stack = nodeEdPane.findChild(QStackedLayout)
-        self._graphView = stack.currentWidget().findChild(QGraphicsView)
+        stack = nodeEdPane.findChild(QtWidgets.QStackedLayout)
+        self._graphView = stack.currentWidget().findChild(QtWidgets.QGraphicsView)
         self._scene = self._graphView.scene()
 
     @property
@@ -138,102 +597,50 @@ class NodeEditorUI(object):
             self._getCurrentView()
         return self._name
 
-    def getStreams(self, allNodeNames=None):
+    def getGraph(self, allNodeNames=None):
+        """Build the connection graph of the nodes in the current panel
+
+        Arguments:
+            allNodeNames (list, optional): The full names of the nodes to include.
+                If not supplied then use all the nodes in the editor
+
+        Returns:
+            Graph: The graph of the connections between the given nodes
+        """
         allNodeNames = allNodeNames or self.getAllNodeNames()
+        if self.dgCache is not None:
+            return self.dgCache.getGraph(allNodeNames)
         nnset = set(allNodeNames)
-        # For all those objects get the up/down streams limited by the current panel
-        ups, downs = {}, {}
+        # Every connection inside the panel is the upstream of some panel node
+        # so only one direction needs to be queried
+        edges = []
         for k in nnset:
-
             ucnx = cmds.listConnections(k, destination=False, shapes=True) or []
             ucnx = cmds.ls(ucnx, long=True) or []
-            ups[k] = sorted(set(ucnx) & nnset)
-
-            dcnx = cmds.listConnections(k, source=False, shapes=True) or []
-            dcnx = cmds.ls(dcnx, long=True) or []
-            downs[k] = sorted(set(dcnx) & nnset)
-
-        return ups, downs
-
-    @staticmethod
-    def _buildFullTree(cnx):
-        """Given a dictionary of {node->[direct connections]}, build a dictionary
-        of {node->[All Downstreams]}. Also detect cycles while we're in there
+            edges.extend((u, k) for u in ucnx)
+        return Graph(nnset, edges)
 
-        Arguments:
-            cnx (dict): The dictionary of direct connections
+    def getStreams(self, allNodeNames=None):
+        """Get the direct up/down streams limited by the current panel
 
         Returns:
-            dict: Dictionary of fully recursive connections
-            list: List of cycles encountered
+            dict: {nodeName: [sorted upstream names]}
+            dict: {nodeName: [sorted downstream names]}
         """
-
-        def _bft(k, cnx, ret, path, cycles, depth=0):
-            if k in path:
-                cycles.append(set(path[path.index(k) :]))
-            elif k not in ret:
-                fts = set()
-                p = path + [k]
-                for ups in cnx[k]:
-                    fts |= _bft(ups, cnx, ret, p, cycles, depth + 1)
-                ret[k] = fts
-            return set([k]) | ret.get(k, set())
-
-        ret = {}
-        cycles = []
-        for k in cnx.keys():
-            _bft(k, cnx, ret, [], cycles)
-
-        # Turn the cycles into dicts so I can quickly access them
-        # based off the current object
-        cDict = {}
-        for cy in cycles:
-            for c in cy:
-                cDict[c] = cy
-
-        dDict = {}
-        for k, v in ret.items():
-            dDict[k] = v - set([k])
-
-        return dDict, cDict
-
-    @property
-    def ups(self):
-        if self._ups is None:
-            self._ups, self._downs = self.getStreams()
-        return self._ups
+        graph = self.getGraph(allNodeNames=allNodeNames)
+        return graph.upsDict(), graph.downsDict()
 
     @property
-    def downs(self):
-        if self._downs is None:
-            self._ups, self._downs = self.getStreams()
-        return self._downs
+    def graph(self):
+        if self._graph is None:
+            self._graph = self.getGraph()
+        return self._graph
 
     @property
-    def fullUps(self):
-        if self._fullUps is None:
-            self._fullUps, cycles = self._buildFullTree(self.ups)
-            if self._cycles is None:
-                self._cycles = cycles
-        return self._fullUps
-
-    @property
-    def fullDowns(self):
-        if self._fullDowns is None:
-            self._fullDowns, cycles = self._buildFullTree(self.downs)
-            if self._cycles is None:
-                self._cycles = cycles
-        return self._fullDowns
-
-    @property
-    def cycles(self):
-        if self._cycles is None:
-            # If cycles is None, then neither fullUps/fullDowns has been called
-            # So, if I'm gonna compute it anyway, may as well store it for later
-            # The buildTreeLayers call uses the fullDownstreams, so may as well
-            # compute that one
-            self._fullDowns, self._cycles = self._buildFullTree(self.downs)
-        return self._cycles
+    def nodeObjects(self):
+        if self._nodeObjects is None:
+            self._nodeObjects = self.getAllNodeObjects()
+        return self._nodeObjects
 
     def getSelItems(self):
         """Get the nodes selected in the UI panel
@@ -246,7 +653,7 @@ class NodeEditorUI(object):
         # QGraphicsPathItems (The connection lines)
         # QGraphicsSimpleTextItem (The node names)
         # QGraphicsWidget (The sub-sections of each node, like the tree and filter lines)
-        items = [i for i in items if type(i) is QGraphicsItem]
+        items = [i for i in items if type(i) is QtWidgets.QGraphicsItem]
         return items
 
     def getAllItems(self):
@@ -256,7 +663,7 @@ class NodeEditorUI(object):
             list(QGraphicsItem): The nodes in the current editor tab
         """
         items = self.scene.items()
-        items = [i for i in items if type(i) is QGraphicsItem]
+        items = [i for i in items if type(i) is QtWidgets.QGraphicsItem]
         return items
 
     @staticmethod
@@ -274,7 +681,7 @@ class NodeEditorUI(object):
         """
         # TODO: Try and get the full node name
         chis = node.childItems()
-        chis = [i for i in chis if isinstance(i, QGraphicsSimpleTextItem)]
+        chis = [i for i in chis if isinstance(i, QtWidgets.QGraphicsSimpleTextItem)]
         if not chis:
             return None
         nameItem = chis[0]
@@ -314,7 +721,7 @@ class NodeEditorUI(object):
         between the nodes
         """
         ipos = setter.getItemPos(items)
-        order = sorted(list(range(len(ipos))), key=ipos)
+        order = sorted(list(range(len(ipos))), key=ipos.__getitem__)
         sizes = setter.getSizes(items)
 
         curPos = ipos[order[0]] - offset
@@ -324,14 +731,30 @@ class NodeEditorUI(object):
             curPos += sizes[idx] + offset
 
     @staticmethod
-    def distribute(items, setter):
+    def distribute(items, setter, prc=None):
         """
         A funciton that distributes the given nodes between the current
         min and max percent slices along an axis determined by the given setter
+
+        Arguments:
+            items (list): The QGraphicsItems to distribute
+            setter (Setter): The setter class
+            prc (float, optional): Evenly space the points this percentage of
+                the way across each item, so 0.0 spaces out the left/top
+                edges. By default the gaps between the items are made even
         """
         ipos = setter.getItemPos(items)
         sizes = setter.getSizes(items)
 
+        if prc is not None:
+            anchors = [p + prc * s for p, s in zip(ipos, sizes)]
+            order = sorted(range(len(anchors)), key=anchors.__getitem__)
+            start, stop = anchors[order[0]], anchors[order[-1]]
+            step = (stop - start) / max(len(order) - 1, 1)
+            for i, idx in enumerate(order):
+                setter.set(items[idx], start + i * step - prc * sizes[idx])
+            return
+
         order = sorted(enumerate(ipos), key=lambda x: x[1])
         order, iposS = list(zip(*order))
         sizesS = [sizes[i] for i in order]
@@ -353,28 +776,87 @@ class NodeEditorUI(object):
             setter.set(item, v)
 
     @staticmethod
-    def columnRowSwap(items):
+    def tidyGrid(items, hSpacing=50.0, vSpacing=25.0):
+        """Snap the given items into rows and columns detected from where
+        they currently are, with even gaps between the rows and columns
+
+        Arguments:
+            items (list): The QGraphicsItems to tidy
+            hSpacing (float): The gap between columns
+            vSpacing (float): The gap between rows
+        """
+        rects = [i.sceneBoundingRect() for i in items]
+        rects = [(r.x(), r.y(), r.width(), r.height()) for r in rects]
+        newPos = gridPositions(rects, hSpacing=hSpacing, vSpacing=vSpacing)
+        # Everything is computed up front, so the items are only moved once
+        for item, r, (x, y) in zip(items, rects, newPos):
+            item.moveBy(x - r[0], y - r[1])
+
+    @staticmethod
+    def transform(items, matrix):
+        """Move the given items by an affine transform of their centers, in one
+        batched write. The nodes themselves stay upright and keep their size,
+        and get pushed apart when a turn or transpose would make them overlap
+
+        Arguments:
+            items (list): The QGraphicsItems to move
+            matrix (tuple): An (a, b, c, d, e, f) affine transform
+        """
+        rects = [i.sceneBoundingRect() for i in items]
+        rects = [(r.x(), r.y(), r.width(), r.height()) for r in rects]
+        for item, r, (x, y) in zip(items, rects, transformRects(rects, matrix)):
+            item.moveBy(x - r[0], y - r[1])
+
+    @staticmethod
+    def getPivot(items, pivot=None):
+        """Get the (x, y) pivot for a transform. Defaults to the center of
+        the items' bounding box
+        """
+        if pivot is not None:
+            return pivot
+        rects = [i.sceneBoundingRect() for i in items]
+        return boundsCenter([(r.x(), r.y(), r.width(), r.height()) for r in rects])
+
+    @classmethod
+    def mirror(cls, items, axis="x", pivot=None):
+        """Mirror the items across the vertical ("x") or horizontal ("y") line
+        through the pivot
+        """
+        cls.transform(items, mirrorAffine(axis, cls.getPivot(items, pivot)))
+
+    @classmethod
+    def rotate(cls, items, quarterTurns=1, pivot=None):
+        """Rotate the item positions clockwise by 90 degree turns"""
+        cls.transform(items, rotateAffine(quarterTurns, cls.getPivot(items, pivot)))
+
+    @classmethod
+    def scaleSpacing(cls, items, sx, sy=None, pivot=None):
+        """Scale the distances between the items around the pivot"""
+        sy = sx if sy is None else sy
+        cls.transform(items, scaleAffine(sx, sy, cls.getPivot(items, pivot)))
+
+    @classmethod
+    def translateTo(cls, items, pivot):
+        """Move the items so the center of their bounding box is at the pivot"""
+        cx, cy = cls.getPivot(items)
+        cls.transform(items, translateAffine(pivot[0] - cx, pivot[1] - cy))
+
+    @classmethod
+    def transpose(cls, items, pivot=None):
+        """Swap rows and columns by mirroring across the diagonal through
+        the pivot
+        """
+        cls.transform(items, transposeAffine(cls.getPivot(items, pivot)))
+
+    @classmethod
+    def columnRowSwap(cls, items):
         """Swap columns to rows and vice versa"""
-        p = [i.pos() for i in items]
-        xy = [(i.x(), i.y()) for i in p]
-        x, y = xy[0]
-        x, y = (x - y, y - x)
-        xy = [(a + x, b + y) for a, b in xy]
-        for i, xy in zip(items, xy):
-            i.setX(xy[1])
-            i.setY(xy[0])
+        r = items[0].sceneBoundingRect()
+        cls.transpose(items, pivot=(r.center().x(), r.center().y()))
 
     @staticmethod
     def getDepNode(nodeName):
-        mobj = om.MObject()
-        selectionList = om.MSelectionList()
-        try:
-            selectionList.add(str(nodeName))
-        except Exception:
-            return None
-        selectionList.getDependNode(0, mobj)
-        fn = om.MFnDependencyNode(mobj)
-        return fn
+        return getResolver().getDepNode(nodeName)
 
     @staticmethod
     def getAttrDict(dep):
@@ -422,6 +904,8 @@ class NodeEditorUI(object):
 
     def getCurrentState(self, nodeDict=None):
         """Get the total state of the current graph"""
+        # Moves that are still running would leave the items half way there
+        finishAppliers()
         posDict = {}
         nodeDict = nodeDict or self.getAllNodeObjects()
         for nn, node in nodeDict.items():
@@ -429,6 +913,10 @@ class NodeEditorUI(object):
             posDict[nn] = (r.x(), r.y(), r.width(), r.height())
         return posDict
 
+    def getMetrics(self):
+        """Measure the current layout of the graph. See metrics.layoutMetrics"""
+        return layoutMetrics(self.getCurrentState(), self.graph.upsDict())
+
     def getAllNodeNames(self):
         """Get the full names of all the nodes in the current node editor"""
         allNodeNames = cmds.ls(
@@ -436,9 +924,14 @@ class NodeEditorUI(object):
         )
         return allNodeNames
 
-    def getAllNodeObjects(self):
-        """Get all the Qt node objects keyed by their names"""
-        allNodeNames = self.getAllNodeNames()
+    def getAllNodeObjects(self, allNodeNames=None):
+        """Get all the Qt node objects keyed by their names
+
+        Arguments:
+            allNodeNames (list, optional): The full names of the nodes to get.
+                If not supplied then get all the nodes in the editor
+        """
+        allNodeNames = allNodeNames or self.getAllNodeNames()
         nnDict = {}
         with restoreSel():
             for nn in allNodeNames:
@@ -461,9 +954,15 @@ class NodeEditorUI(object):
         """
         allNodeObjects = allNodeObjects or self.getAllNodeObjects()
 
+        # Resolve all the names in one go so the loop only hits the cache
+        mobjs = getResolver().resolve(list(allNodeObjects.keys()))
+
         ret = {}
         for nodeName, node in allNodeObjects.items():
-            dep = self.getDepNode(nodeName)
+            if nodeName not in mobjs:
+                ret[nodeName] = []
+                continue
+            dep = om.MFnDependencyNode(mobjs[nodeName])
             adict = self.getAttrDict(dep)
             # childItems should return the simpleText name item
             # and the node's graphicsWidget tree if it exists
@@ -488,23 +987,77 @@ class NodeEditorUI(object):
             ret[nodeName] = retVal
         return ret
 
+    def getTopLevelAttrNames(self, allNodeObjects=None):
+        """Get the names of the top-level attributes displayed on each node
+
+        Returns:
+            dict: {nodeFullName: [attrName, ...]} in display order
+        """
+        attrs = self.getAllTopLevelAttrs(allNodeObjects=allNodeObjects)
+        return {k: [a.name() for a in v] for k, v in attrs.items()}
+
+    def getNodeTypes(self, allNodeNames):
+        """Get the type of each of the given nodes
+
+        Returns:
+            dict: {nodeFullName: typeName}. Nodes that don't resolve are left out
+        """
+        mobjs = getResolver().resolve(allNodeNames)
+        fn = om.MFnDependencyNode()
+        ret = {}
+        for n, mobj in mobjs.items():
+            fn.setObject(mobj)
+            ret[n] = fn.typeName()
+        return ret
+
+    def getContainers(self, allNodeNames):
+        """Get the container or asset each of the given nodes is in
+
+        Returns:
+            list: The container name of each node, or "" if it's not in one
+        """
+        return [cmds.container(query=True, findContainer=n) or "" for n in allNodeNames]
+
+    def getPlugOffsets(self, allNodeObjects=None):
+        """Get the local Y of every displayed top-level attribute of the nodes
+
+        Arguments:
+            allNodeObjects (dict, optional): {nodeFullName: QGraphicsItem} of the
+                nodes to check. If not supplied then check all the nodes
+
+        Returns:
+            dict: {nodeFullName: {attrName: localY}} with Y measured from the top
+                of the node, and attrName lowercase with no spaces
+        """
+        allNodeObjects = allNodeObjects or self.getAllNodeObjects()
+        mobjs = getResolver().resolve(list(allNodeObjects.keys()))
+        geo = getPlugGeometry()
+        fn = om.MFnDependencyNode()
+        ret = {}
+        for nodeName, node in allNodeObjects.items():
+            if nodeName not in mobjs:
+                ret[nodeName] = {}
+                continue
+            fn.setObject(mobjs[nodeName])
+            ret[nodeName] = geo.getOffsets(fn.typeName(), node)
+        return ret
+
     def buildTreeLayers(self, seeds):
         """For a given node editor, determine the right-to-left "layers" for layout
         This *should* build the exact same layers as the built-in layout command
         Arguments:
-            seeds (list): A list of items to get the upstreams of
+            seeds (list): A list of graph ids to get the upstreams of
 
         Returns:
-            list: An ordered list of unordered layers
+            list: An ordered list of unordered layers of graph ids
         """
-        # seeds = sorted(set([k for k, v in self.downs.iteritems() if not v]))
-
-        tree = [seeds[:]]
-        memo = set(copy.copy(tree[0]))
+        graph = self.graph
+        tree = [list(seeds)]
+        memo = set(tree[0])
         for _ in range(2048):
             layer = set()
             for s in tree[-1]:
-                layer |= set(self.ups[s])
+                layer.update(graph.ups(s))
 
             if not layer:
                 break
@@ -514,12 +1067,12 @@ class NodeEditorUI(object):
             # currently in the tree can be added
             adc = set()
             for i in layer:
-                adc |= self.cycles.get(i, set())
+                adc.update(graph.cycle(i))
 
             newLayer = []
             for i in layer:
-                fd = self.fullDowns[i] - adc
-                if not (fd - memo):
+                fd = graph.fullDowns(i)
+                if all(d in memo or d in adc for d in fd):
                     newLayer.append(i)
 
             if not newLayer:
@@ -532,71 +1085,69 @@ class NodeEditorUI(object):
         return tree
 
     @staticmethod
-    def getTreeSeeds(seeds, fullUps):
-        """Given a list of seed items, group them so that any pair of items in
-        a group share at least one upstream
+    def getTreeSeeds(seeds, graph):
+        """Given a list of seed items, group them so that the items in
+        a group are all connected through their upstreams
 
         Arguments:
-            seeds (list): A list of the right-most items in the node editor tree
+            seeds (list): A list of the right-most graph ids in the node editor tree
                 These items shuld have upstreams, but not downstreams.
                 ie. self.buildTreeLayers()[0]
-            fullUps (dict): The self.fullUps dictionary
+            graph (Graph): The connection graph
 
         Returns:
             list: A list of lists of layer-0 tree items. The upstreams of each set
                 set together form a full interconnected tree.
         """
-        # Basically, loop through the seeds to find overlapping values
-        # When we find an overlapping value, merge them, and restart
-        # the whole process. If we make it through the whole process
-        # without finding a merge, then we can return
-        # Note: If a for-loop ends from a break, the else *isn't* run
-
-        seeds = {frozenset([i]): fullUps[i] for i in seeds}
-        for _ in range(1024):
-            items = list(seeds.items())
-            for ka, va in items:
-                for kb, vb in items:
-                    if ka is kb:
-                        continue
-                    if va & vb:
-                        del seeds[ka]
-                        del seeds[kb]
-                        seeds[ka | kb] = va | vb
-                        break  # GOTO A
-                else:
-                    continue
-                # A
-                break  # GOTO B
-            else:
-                break  # GOTO C
-            # B
-        else:
-            raise RuntimeError("Too Many Iterations")
-        # C
-        return list(map(sorted, list(seeds.keys())))
+        # Every upstream of a seed ends up at a seed by following its downstreams
+        # So seeds that share upstreams are exactly the seeds that share a
+        # connected component, and we don't have to merge the full upstream
+        # sets pairwise until nothing changes
+        comps = graph.components()
+        groups = {}
+        for s in sorted(seeds):
+            groups.setdefault(comps[s], []).append(s)
+        return list(groups.values())
+
+    def getIncomingPlugs(self, node):
+        """Get the plug-level connections coming into a node
+
+        Arguments:
+            node (str): The full name of the node
+
+        Returns:
+            list: (dstPlug, srcPlug) pairs in the order maya lists them
+        """
+        if self.dgCache is not None:
+            return self.dgCache.getIncomingPlugs(node)
+        return queryIncomingPlugs(node)
+
+    def getAliases(self, node):
+        """Get the attribute aliases of a node
+
+        Returns:
+            dict: {"node.alias": "node.attr"}
+        """
+        if self.dgCache is not None:
+            return self.dgCache.getAliases(node)
+        return queryAliases(node)
 
     def reorderInputs(self, node, inputs, topLevelAttrDict):
         """Given a node and its inputs, reorder the inputs to match the
-        current attribute order"""
-        tlaNames = [i.name() for i in topLevelAttrDict.get(node, [])]
+        current attribute order
+
+        Arguments:
+            node (str): The full name of the node
+            inputs (list): The full names of the node's inputs
+            topLevelAttrDict (dict): The getTopLevelAttrNames() results
+        """
+        tlaNames = topLevelAttrDict.get(node, [])
         if not tlaNames:
             return inputs
 
-        aliases = cmds.aliasAttr(node, query=True) or []
-        aliases = ["{0}.{1}".format(node, i) for i in aliases]
-        aliases = dict(_flatToTuples(aliases))
-
-        ucnx = cmds.ls(
-            cmds.listConnections(
-                node, destination=False, shapes=True, plugs=True, connections=True
-            )
-            or [],
-            long=True,
-        )
-
-        ucnx = [aliases.get(i, i) for i in ucnx]
-        allPairs = _flatToTuples(ucnx)
+        aliases = self.getAliases(node)
+        allPairs = self.getIncomingPlugs(node)
+        allPairs = [(aliases.get(d, d), aliases.get(s, s)) for d, s in allPairs]
         pairs = [i for i in allPairs if i[1].split(".")[0] in inputs]
 
         # `pairs` is now structured as [(inPlug, outPlug), ...]
@@ -615,13 +1166,17 @@ class NodeEditorUI(object):
 
     def reorderLayer(self, prev, layer, topLevelAttrDict):
         """Starting from the previous layer, get the order for the new layer"""
+        graph = self.graph
+        layer = set(layer)
         # Get the possibly repeated chunks
         chunks = []
         memo = set()
         for p in prev:
-            chunk = [i for i in self.ups[p] if i in layer]
-            chunk = self.reorderInputs(p, chunk, topLevelAttrDict)
-            chunk = [i for i in chunk if i not in memo]
+            chunk = [i for i in graph.ups(p) if i in layer]
+            chunk = self.reorderInputs(
+                graph.name(p), graph.toNames(chunk), topLevelAttrDict
+            )
+            chunk = [i for i in graph.toIds(chunk) if i not in memo]
             # Only keep nodes the first time they're encountered
             # Later: Maybe average where they connect in the list
             # and put them closer to the "middle"
@@ -632,13 +1187,15 @@ class NodeEditorUI(object):
 
     def sortTreeLayers(self, tree):
         """Sort the given tree layers top-to-bottom"""
-        ano = self.getAllNodeObjects()
+        graph = self.graph
+        ano = self.nodeObjects
         allNodeObjects = {}
         for layer in tree:
             for item in layer:
-                allNodeObjects[item] = ano[item]
+                name = graph.name(item)
+                allNodeObjects[name] = ano[name]
 
-        topLevelAttrDict = self.getAllTopLevelAttrs(allNodeObjects=allNodeObjects)
+        topLevelAttrDict = self.getTopLevelAttrNames(allNodeObjects=allNodeObjects)
 
         newTree = [tree[0][:]]
         for i in range(1, len(tree)):
@@ -652,48 +1209,707 @@ class NodeEditorUI(object):
         This naive version just stacks things in layers, and nothing else
         """
 
-        nodeDict = self.getAllNodeObjects()
+        nodeDict = self.nodeObjects
         state = self.getCurrentState(nodeDict=nodeDict)
 
-        hSpacing = 100
-        vSpacing = 50
+        positions = {}
         cx = 0
         for layer in reversed(tree):
             cw, ch = 0, 0
-            for item in layer:
+            for item in self.graph.toNames(layer):
                 x, y, w, h = state[item]
-                node = nodeDict[item]
-                node.setY(ch)
-                node.setX(cx)
+                positions[item] = (cx, ch)
                 cw = max(cw, w)
-                ch += h + vSpacing
-            cx += cw + hSpacing
+                ch += h + self.vSpacing
+            cx += cw + self.hSpacing
+        self.applyPositions(positions)
+
+    def getPlugConnections(self, ids):
+        """Get the plug-level connections coming into the given nodes from
+        other nodes in the graph
+
+        Arguments:
+            ids (iterable): The graph ids of the downstream nodes to check
+
+        Returns:
+            dict: {(srcId, dstId): [(srcPlug, dstPlug), ...]}
+        """
+        graph = self.graph
+        ret = {}
+        for d in ids:
+            for dstPlug, srcPlug in self.getIncomingPlugs(graph.name(d)):
+                sName = srcPlug.split(".")[0]
+                if sName in graph:
+                    key = (graph.index(sName), d)
+                    ret.setdefault(key, []).append((srcPlug, dstPlug))
+        return ret
+
+    def getPlugEdges(self, tree, plugOffsets, heights, plugConnections=None):
+        """Get the plug-level connections between the nodes of a tree
+
+        Arguments:
+            tree (list): The layers of graph ids
+            plugOffsets (dict): {nodeFullName: {attrName: localY}}
+            heights (dict): {graphId: nodeHeight} Plugs that aren't displayed
+                are treated as if they're in the middle of their node
+            plugConnections (dict, optional): Pre-computed getPlugConnections
+                results. If not supplied then the tree's nodes are queried
 
-    # TODO
-    def layoutTreeLayers(self, tree):
+        Returns:
+            list: (srcId, srcPlugOffset, dstId, dstPlugOffset) tuples
+        """
+        graph = self.graph
+        members = set(i for layer in tree for i in layer)
+        if plugConnections is None:
+            plugConnections = self.getPlugConnections(members)
+        edges = []
+        for (s, d), pairs in plugConnections.items():
+            if s not in members or d not in members:
+                continue
+            sOffs = plugOffsets.get(graph.name(s), {})
+            dOffs = plugOffsets.get(graph.name(d), {})
+            for srcPlug, dstPlug in pairs:
+                sOff = sOffs.get(_topAttr(srcPlug))
+                dOff = dOffs.get(_topAttr(dstPlug))
+                if sOff is None:
+                    sOff = heights[s] / 2.0
+                if dOff is None:
+                    dOff = heights[d] / 2.0
+                edges.append((s, sOff, d, dOff))
+        return edges
+
+    def layoutTreeLayers(self, tree, plugConnections=None):
         """Determine the real vertical positions of the nodes in the given tree
         that will make a straighter, more readable graph
+
+        This starts from the naive stacked layers, then moves the nodes in each
+        layer so the plug connections are as horizontal as possible
+
+        Arguments:
+            tree (list): The sorted layers of graph ids
+            plugConnections (dict, optional): Pre-computed getPlugConnections
+                results
+
+        Returns:
+            dict: {nodeFullName: (x, y)} relative to the top-left of the tree
+        """
+        graph = self.graph
+        names = {i: graph.name(i) for layer in tree for i in layer}
+        treeObjects = {n: self.nodeObjects[n] for n in names.values()}
+        state = self.getCurrentState(nodeDict=treeObjects)
+        plugOffsets = self.getPlugOffsets(allNodeObjects=treeObjects)
+        heights = {i: state[n][3] for i, n in names.items()}
+
+        xs, initial = {}, {}
+        cx = 0
+        for layer in reversed(tree):
+            cw, ch = 0, 0
+            for i in layer:
+                x, y, w, h = state[names[i]]
+                xs[i] = cx
+                initial[i] = ch
+                cw = max(cw, w)
+                ch += h + self.vSpacing
+            cx += cw + self.hSpacing
+
+        edges = self.getPlugEdges(tree, plugOffsets, heights, plugConnections)
+        ys = straightenLayers(tree, heights, edges, initial, spacing=self.vSpacing)
+        top = min(ys.values())
+        return {names[i]: (xs[i], ys[i] - top) for i in names}
+
+    def stackTrees(self, trees):
+        """Given a list of placed trees, stack their bounding boxes top to bottom
+
+        Arguments:
+            trees (list): A list of {nodeFullName: (x, y)} dicts, one per tree
+
+        Returns:
+            dict: {nodeFullName: (x, y)} for every node in every tree
         """
-        pass
+        nodeDict = self.nodeObjects
+        ret = {}
+        cy = 0
+        for positions in trees:
+            bottom = 0
+            for name, (x, y) in positions.items():
+                ret[name] = (x, y + cy)
+                h = nodeDict[name].sceneBoundingRect().height()
+                bottom = max(bottom, y + h)
+            cy += bottom + 2 * self.vSpacing
+        return ret
 
-    # TODO
-    def placeNodes(self, trees):
+    def arrangeTrees(self, trees, compact=False):
+        """Stack the placed trees, and optionally compact the result
+
+        Arguments:
+            trees (list): A list of {nodeFullName: (x, y)} dicts, one per tree
+            compact (bool): Pull the nodes together. See compactPositions
+
+        Returns:
+            dict: {nodeFullName: (x, y)} for every node in every tree
+        """
+        positions = self.stackTrees(trees)
+        if compact:
+            groups = {n: i for i, tree in enumerate(trees) for n in tree}
+            positions = self.compactPositions(positions, groups=groups)
+        return positions
+
+    def compactPositions(self, positions, groups=None):
+        """Pull laid out nodes together as far as they can go without
+        overlapping
+
+        First each node slides right into the empty space that narrower nodes
+        leave in a wide layer, but never past one of its downstreams, so the
+        connections still run left to right. Only x changes, so the plugs at
+        each end of a connection stay at the same heights. Then each group
+        slides up as one piece, so the gaps between stacked trees close up
+        around their outlines instead of their bounding boxes
+
+        Arguments:
+            positions (dict): {nodeFullName: (x, y)}
+            groups (dict, optional): {nodeFullName: groupKey} of the nodes that
+                are compacted horizontally on their own and move up together,
+                like the trees from stackTrees. The groups can't overlap
+                vertically. By default all the nodes are compacted horizontally
+                together, and each node moves up by itself
+
+        Returns:
+            dict: {nodeFullName: (x, y)} The compacted positions
+        """
+        nodeDict = self.nodeObjects
+        graph = self.graph
+        groupOf = (lambda n: None) if groups is None else groups.get
+
+        # The layers are built right to left from the sinks, so slide the
+        # nodes right toward their downstreams by compacting the mirror image
+        # of each group, with the edges reversed
+        rects, mirrored, edges = {}, {}, {}
+        for n, (x, y) in positions.items():
+            r = nodeDict[n].sceneBoundingRect()
+            w, h = r.width(), r.height()
+            rects[n] = (x, y, w, h)
+            g = groupOf(n)
+            mirrored.setdefault(g, {})[n] = (-x - w, y, w, h)
+            if n in graph:
+                for d in graph.toNames(graph.downs(graph.index(n))):
+                    if d in positions and groupOf(d) == g:
+                        edges.setdefault(g, []).append((d, n))
+
+        # Nodes closer than vSpacing vertically can't slide past each other
+        ret = {}
+        for g, gRects in mirrored.items():
+            moved = compactRects(
+                gRects, self.hSpacing, self.vSpacing, edges=edges.get(g, ())
+            )
+            ret.update((n, (-x - w, y, w, h)) for n, (x, y, w, h) in moved.items())
+        gap = 2 * self.vSpacing
+        ret = compactRects(ret, gap, self.hSpacing, axis=1, groups=groups)
+
+        if self.compaction is not None:
+            before, after = self.compaction
+            after += boundsArea(list(ret.values()))
+            self.compaction = (before + boundsArea(list(rects.values())), after)
+        return {n: (r[0], r[1]) for n, r in ret.items()}
+
+    def placeNodes(self, trees, offset=(0.0, 0.0), compact=False):
         """Given a list of placed trees, find their bounding boxes, get the real
         node position values, and actually set the data on the Qt items
+
+        Arguments:
+            trees (list): A list of {nodeFullName: (x, y)} dicts, one per tree
+            offset (tuple): An (x, y) offset to add to every position
+            compact (bool): Pull the nodes together. See compactPositions
+        """
+        dx, dy = offset
+        positions = self.arrangeTrees(trees, compact=compact)
+        self.applyPositions({n: (x + dx, y + dy) for n, (x, y) in positions.items()})
+
+    def applyPositions(self, positions, extraMoves=(), merge=False):
+        """Move nodes to the given positions as a single undo step
+
+        Arguments:
+            positions (dict): {nodeFullName: (x, y)}
+            extraMoves (list): (item, x, y) of any other items to move
+            merge (bool): Make the moves part of the last undo step
+
+        Returns:
+            PositionApplier: The applier doing the moves
+        """
+        nodeDict = self.nodeObjects
+        moves = [(nodeDict[n], x, y) for n, (x, y) in positions.items()]
+        return self.applyItemPositions(moves + list(extraMoves), merge=merge)
+
+    def applyItemPositions(self, moves, merge=False):
+        """Move items without freezing the editor. See PositionApplier
+
+        Arguments:
+            moves (list): (item, x, y) of each item to move
+            merge (bool): Make the moves part of the last undo step
+
+        Returns:
+            PositionApplier: The applier doing the moves
+        """
+        applier = PositionApplier(
+            self.scene,
+            moves,
+            view=self.graphView,
+            history=getPositionHistory(),
+            merge=merge,
+        )
+        applier.start()
+        return applier
+
+    def getBoundaryConnections(self, selNames, editorNames):
+        """Get the connections between the given nodes and the rest of the editor
+
+        Arguments:
+            selNames (list): The full names of the nodes inside the boundary
+            editorNames (set): The full names of all the nodes in the editor
+
+        Returns:
+            list: (insideName, insidePlug, outsideName, outsidePlug) tuples
+        """
+        selSet = set(selNames)
+        ret = []
+        for name in selNames:
+            cnx = cmds.listConnections(name, shapes=True, plugs=True, connections=True)
+            for inPlug, outPlug in _longPlugPairs(cnx):
+                other = outPlug.split(".")[0]
+                if other in editorNames and other not in selSet:
+                    ret.append((name, inPlug, other, outPlug))
+        return ret
+
+    def getAnchorOffset(self, positions, before, boundary):
+        """Find where to put a laid out selection so it fits the fixed nodes
+        around it
+
+        The vertical offset is the least-squares fit of the boundary plug
+        connections. Without any, the selection stays centered where it was
+
+        Arguments:
+            positions (dict): {nodeFullName: (x, y)} of the laid out selection
+            before (QRectF): The bounding box of the selection before layout
+            boundary (list): The getBoundaryConnections() tuples
+
+        Returns:
+            tuple: The (x, y) offset to apply to the positions
+        """
+        if not positions:
+            return 0.0, 0.0
+        nodeDict = self.nodeObjects
+        sizes = {}
+        for name in positions:
+            r = nodeDict[name].sceneBoundingRect()
+            sizes[name] = (r.width(), r.height())
+        left = min(x for x, y in positions.values())
+        right = max(x + sizes[n][0] for n, (x, y) in positions.items())
+        top = min(y for x, y in positions.values())
+        bottom = max(y + sizes[n][1] for n, (x, y) in positions.items())
+        dx = before.center().x() - (left + right) / 2.0
+        dy = before.center().y() - (top + bottom) / 2.0
+        if not boundary:
+            return dx, dy
+
+        outside = sorted(set(b[2] for b in boundary))
+        outObjects = self.getAllNodeObjects(allNodeNames=outside)
+        offsets = self.getPlugOffsets(allNodeObjects=outObjects)
+        offsets.update(self.getPlugOffsets(allNodeObjects=nodeDict))
+        residuals = []
+        for inName, inPlug, outName, outPlug in boundary:
+            if inName not in positions or outName not in outObjects:
+                continue
+            outRect = outObjects[outName].sceneBoundingRect()
+            inOff = offsets[inName].get(_topAttr(inPlug), sizes[inName][1] / 2.0)
+            outOff = offsets[outName].get(_topAttr(outPlug), outRect.height() / 2.0)
+            inY = positions[inName][1] + inOff
+            residuals.append(outRect.top() + outOff - inY)
+        if residuals:
+            dy = sum(residuals) / len(residuals)
+        return dx, dy
+
+    def pushColliders(self, rects, items):
+        """Get the moves that push any other nodes that overlap the bounding
+        box of the given rects out of the way, along whichever direction is
+        the shortest move
+
+        Arguments:
+            rects (list): The QRectFs the given items are moving to
+            items (list): The items that are moving, which don't get pushed
+
+        Returns:
+            list: (item, x, y) of each node that has to move
+        """
+        moves = []
+        if not rects:
+            return moves
+        box = rects[0]
+        for r in rects[1:]:
+            box = box.united(r)
+        m = self.vSpacing / 2.0
+        box = box.adjusted(-m, -m, m, m)
+
+        itemSet = set(items)
+        for other in self.scene.items(box):
+            if type(other) is not QtWidgets.QGraphicsItem or other in itemSet:
+                continue
+            o = other.sceneBoundingRect()
+            pushes = [
+                (o.bottom() - box.top(), 0.0, -1.0),
+                (box.bottom() - o.top(), 0.0, 1.0),
+                (o.right() - box.left(), -1.0, 0.0),
+                (box.right() - o.left(), 1.0, 0.0),
+            ]
+            dist, sx, sy = min(pushes)
+            pos = other.pos()
+            moves.append((other, pos.x() + sx * dist, pos.y() + sy * dist))
+        return moves
+
+    @contextmanager
+    def scopedGraph(self, graph, nodeObjects=None):
+        """Temporarily run the layout methods on a different graph
+
+        Arguments:
+            graph (Graph): The graph to use
+            nodeObjects (dict, optional): The {nodeFullName: QGraphicsItem} to
+                use with it. Defaults to keeping the current ones
+        """
+        old = self._graph, self._nodeObjects
+        self._graph = graph
+        if nodeObjects is not None:
+            self._nodeObjects = nodeObjects
+        try:
+            yield
+        finally:
+            self._graph, self._nodeObjects = old
+
+    def layoutGraph(self, graph=None):
+        """Run the layer/sort/straighten pipeline on a graph
+
+        Arguments:
+            graph (Graph, optional): The graph to lay out. Defaults to self.graph
+
+        Returns:
+            list: A list of {nodeFullName: (x, y)} dicts, one per tree
+        """
+        with self.scopedGraph(graph or self.graph):
+            graph = self.graph
+            seeds = self.getTreeSeeds(graph.sinks(), graph)
+            trees = [self.buildTreeLayers(s) for s in seeds]
+            plugConnections = self.getPlugConnections(range(len(graph)))
+            hasher = self.getShapeHasher(plugConnections)
+
+            # Rigs are full of identical sub-networks, so only lay out each
+            # distinct shape once, and stamp its positions onto the copies.
+            # Shapes are matched per whole tree. A tree that only shares a
+            # branch with another is still laid out in full, because where
+            # that branch lands depends on the layers and straightening of
+            # the rest of its tree
+            shapes = {}
+            ret = []
+            for tree in trees:
+                key, order = hasher.canonical([i for layer in tree for i in layer])
+                template = shapes.get(key) if key is not None else None
+                if template is None:
+                    tree = self.sortTreeLayers(tree)
+                    positions = self.layoutTreeLayers(tree, plugConnections)
+                    if key is not None:
+                        shapes[key] = [positions[graph.name(i)] for i in order]
+                else:
+                    positions = {graph.name(i): p for i, p in zip(order, template)}
+                ret.append(positions)
+            return ret
+
+    def getShapeHasher(self, plugConnections):
+        """Get a SubtreeHasher for the current graph that matches nodes by
+        their type and size, and edges by the plugs they connect
+
+        Arguments:
+            plugConnections (dict): The getPlugConnections results for the graph
+
+        Returns:
+            SubtreeHasher: The hasher
+        """
+        graph = self.graph
+        names = graph.toNames(range(len(graph)))
+        types = self.getNodeTypes(names)
+        nodeLabels = []
+        for n in names:
+            r = self.nodeObjects[n].sceneBoundingRect()
+            nodeLabels.append((types.get(n), round(r.width()), round(r.height())))
+
+        edgeLabels = {}
+        for key, pairs in plugConnections.items():
+            attrs = [(sp.split(".", 1)[1], dp.split(".", 1)[1]) for sp, dp in pairs]
+            edgeLabels[key] = tuple(sorted(attrs))
+
+        def edgeLabel(u, d):
+            return edgeLabels.get((u, d), ())
+
+        return SubtreeHasher(graph, nodeLabels.__getitem__, edgeLabel)
+
+    def getExtent(self, positions):
+        """Get the (width, height) covered by nodes at the given positions"""
+        nodeDict = self.nodeObjects
+        right, bottom = 0.0, 0.0
+        for name, (x, y) in positions.items():
+            r = nodeDict[name].sceneBoundingRect()
+            right = max(right, x + r.width())
+            bottom = max(bottom, y + r.height())
+        return right, bottom
+
+    def getGroups(self, groupBy, minGroupSize=10):
+        """Get the group name of every node id in the graph
+
+        Arguments:
+            groupBy (str): How to group the nodes. One of
+                "namespace": By the namespace of the node
+                "container": By the container or asset the node is in
+                "component": By connected component. Components smaller
+                    than `minGroupSize` all share one group
+            minGroupSize (int): The smallest component to give its own group
+
+        Returns:
+            list: The group name of each node id
+        """
+        graph = self.graph
+        names = graph.toNames(range(len(graph)))
+        if groupBy == "namespace":
+            return [n.rsplit("|", 1)[-1].rpartition(":")[0] for n in names]
+        if groupBy == "container":
+            return self.getContainers(names)
+        if groupBy == "component":
+            comps = graph.components()
+            counts = {}
+            for c in comps:
+                counts[c] = counts.get(c, 0) + 1
+            return [str(c) if counts[c] >= minGroupSize else "" for c in comps]
+        raise ValueError("Unknown groupBy value: {0}".format(groupBy))
+
+    def layoutHierarchical(self, groupBy="namespace", compact=False):
+        """Lay out a large editor by collapsing groups of nodes into super-nodes
+
+        Each group is laid out on its own from its induced subgraph. Then the
+        groups are treated as boxes in a coarse graph that has an edge wherever
+        two groups are connected, and the boxes are laid out in layers
+
+        Arguments:
+            groupBy (str): How to group the nodes. See getGroups
+            compact (bool): Compact the layout inside each group before the
+                groups are placed. See compactPositions
         """
-        pass
+        graph = self.graph
+        groupOf = self.getGroups(groupBy)
+        members = {}
+        for i, g in enumerate(groupOf):
+            members.setdefault(g, []).append(i)
+
+        # The groups don't depend on each other, so each one only ever
+        # touches its own nodes
+        inner, sizes = {}, {}
+        for g, ids in members.items():
+            sub = graph.subgraph(ids)
+            trees = self.layoutGraph(sub)
+            trees.extend(self.placeUnplaced(trees, sub))
+            positions = self.arrangeTrees(trees, compact=compact)
+            inner[g] = positions
+            sizes[g] = self.getExtent(positions)
+
+        coarse = layerBoxes(
+            graph.quotient(groupOf),
+            sizes,
+            hSpacing=2 * self.hSpacing,
+            vSpacing=2 * self.vSpacing,
+        )
+        final = {}
+        for g, positions in inner.items():
+            gx, gy = coarse[g]
+            for name, (x, y) in positions.items():
+                final[name] = (gx + x, gy + y)
+        self.applyPositions(final)
+
+    def placeUnplaced(self, trees, graph=None):
+        """Tidy the nodes that none of the trees placed into a grid of their
+        own. These are the nodes in cycles that don't lead to any sink, like a
+        constrained transform and its constraint
+
+        Arguments:
+            trees (list): The {nodeFullName: (x, y)} dicts from layoutGraph
+            graph (Graph, optional): The graph the trees were laid out from.
+                Defaults to self.graph
 
-    def layout(self):
-        """Lay out a node editor, taking the order of the plugs into account"""
-        seeds = sorted(set([k for k, v in self.downs.items() if not v]))
-        seeds = self.getTreeSeeds(seeds, self.fullUps)
-        trees = [self.buildTreeLayers(s) for s in seeds]
-        trees = [self.sortTreeLayers(t) for t in trees]
-        for t in trees:
-            self.naiveLayoutTreeLayers(t)
+        Returns:
+            list: One more {nodeFullName: (x, y)} dict for the unplaced nodes,
+                or an empty list if every node was placed
+        """
+        graph = graph or self.graph
+        nodeDict = self.nodeObjects
+        placed = set(n for tree in trees for n in tree)
+        names = graph.toNames(range(len(graph)))
+        names = [n for n in names if n not in placed and n in nodeDict]
+        if not names:
+            return []
+
+        rects = []
+        for n in names:
+            r = nodeDict[n].sceneBoundingRect()
+            rects.append((r.x(), r.y(), r.width(), r.height()))
+        grid = gridPositions(rects, hSpacing=self.hSpacing, vSpacing=self.vSpacing)
+        left = min(x for x, y in grid)
+        top = min(y for x, y in grid)
+        return [{n: (x - left, y - top) for n, (x, y) in zip(names, grid)}]
+
+    def layoutSelected(self):
+        """Lay out only the selected nodes, with the rest of the graph pinned
+
+        Only the selected nodes and their connections are queried, so the
+        work scales with the size of the selection instead of the editor
+        """
+        editorNames = set(self.getAllNodeNames())
+        selNames = [n for n in cmds.ls(sl=True, long=True) if n in editorNames]
+        if not selNames:
+            return
+
+        nodeDict = self.getAllNodeObjects(allNodeNames=selNames)
+        items = list(nodeDict.values())
+        if not items:
+            return
+        before = items[0].sceneBoundingRect()
+        for i in items[1:]:
+            before = before.united(i.sceneBoundingRect())
+
+        # Only scope the selection's graph, so the editor's graph is still
+        # there for any layout that runs after this one
+        with self.scopedGraph(self.getGraph(allNodeNames=selNames), nodeDict):
+            trees = self.layoutGraph()
+            trees.extend(self.placeUnplaced(trees))
+            positions = self.stackTrees(trees)
+            if not positions:
+                return
+            boundary = self.getBoundaryConnections(selNames, editorNames)
+            dx, dy = self.getAnchorOffset(positions, before, boundary)
+
+            # Move the selection and the nodes it pushes aside in one go
+            final, rects = {}, []
+            for name, (x, y) in positions.items():
+                final[name] = (x + dx, y + dy)
+                r = nodeDict[name].sceneBoundingRect()
+                rects.append(QtCore.QRectF(x + dx, y + dy, r.width(), r.height()))
+            self.applyPositions(final, extraMoves=self.pushColliders(rects, items))
+
+    def refineForces(self, timeBudget=0.2, merge=False):
+        """Spread out the nodes that the layered layout can't place well, the
+        ones in cycles and the ones without any connections, with a
+        force-directed pass. Every other node stays put, but still pushes
 
-        # trees = [self.layoutTreeLayers(t) for t in trees]
-        # self.placeNodes(trees)
+        Arguments:
+            timeBudget (float): The most seconds to spend on the simulation
+            merge (bool): Make the moves part of the last undo step, for
+                refining a layout that was just applied
+        """
+        graph = self.graph
+        nodeDict = self.nodeObjects
+        movable = []
+        for i in range(len(graph)):
+            if graph.cycle(i) or not (graph.ups(i) or graph.downs(i)):
+                movable.append(graph.name(i))
+        movable = [n for n in movable if n in nodeDict]
+        if not movable:
+            return
+
+        state = self.getCurrentState(nodeDict=nodeDict)
+        centers = {n: (x + w / 2.0, y + h / 2.0) for n, (x, y, w, h) in state.items()}
+        edges = [(graph.name(u), graph.name(d)) for u, d in graph.edges()]
+        width = sum(s[2] for s in state.values()) / len(state)
+        moved = forceDirected(
+            centers,
+            edges,
+            movable,
+            idealLength=width + self.hSpacing,
+            timeBudget=timeBudget,
+        )
+        final = {}
+        for n, (cx, cy) in moved.items():
+            ox, oy = centers[n]
+            pos = nodeDict[n].pos()
+            final[n] = (pos.x() + cx - ox, pos.y() + cy - oy)
+        self.applyPositions(final, merge=merge)
+
+    def layout(self, selectedOnly=False, groupBy=None, refine=False, compact=False):
+        """Lay out a node editor, taking the order of the plugs into account
+
+        Arguments:
+            selectedOnly (bool): Only lay out the selected nodes. The rest of
+                the graph stays where it is, and only the nodes that end up
+                overlapping the new layout get pushed out of the way
+            groupBy (str, optional): Lay out hierarchically, grouping the
+                nodes by "namespace", "container", or "component"
+            refine (bool): Run a force-directed pass on the nodes in cycles
+                and the unconnected nodes afterwards
+            compact (bool): Pull the nodes together to shrink the area of the
+                layout, keeping the connections inside each tree straight.
+                This doesn't apply when only the selection is laid out. The
+                summed (before, after) areas are left in self.compaction
+        """
+        history = getPositionHistory()
+        steps = len(history)
+        self.compaction = (0.0, 0.0) if compact and not selectedOnly else None
+        if selectedOnly:
+            self.layoutSelected()
+        elif groupBy is not None:
+            self.layoutHierarchical(groupBy=groupBy, compact=compact)
+        else:
+            trees = self.layoutGraph()
+            trees.extend(self.placeUnplaced(trees))
+            self.placeNodes(trees, compact=compact)
+
+        if refine:
+            # The refinement starts from the finished layout, and undoes with it
+            finishAppliers()
+            self.refineForces(merge=len(history) > steps)
+
+
+def layoutAllEditors(**layoutKwargs):
+    """Lay out every tab of every open node editor panel, torn off ones
+    included, in one pass
+
+    Each tab is visited once to get its nodes, the connections of all of
+    them are queried together into one DGCache, and then each tab is laid
+    out from its part of the cache. Every panel is put back on the tab it
+    started on
+
+    Arguments:
+        **layoutKwargs: Passed to NodeEditorUI.layout for each tab
+
+    Returns:
+        list: The NodeEditorUI of every tab that was laid out
+    """
+    dgCache = DGCache()
+    tabs, current = [], []
+    for panel in cmds.getPanel(scriptType="nodeEditorPanel") or []:
+        pane = getEditorPane(panel)
+        if pane is None:
+            continue
+        stack = pane.findChild(QtWidgets.QStackedLayout)
+        current.append((pane, stack.currentIndex()))
+        for index in range(stack.count()):
+            if not setEditorTab(pane, index):
+                continue
+            nui = NodeEditorUI(panel=panel, dgCache=dgCache)
+            tabs.append((pane, index, nui, nui.getAllNodeNames()))
+
+    dgCache.add(n for _, _, _, names in tabs for n in names)
+    try:
+        for pane, index, nui, names in tabs:
+            # Finding the node items selects them, which only shows up in the
+            # current tab
+            setEditorTab(pane, index)
+            nui.layout(**layoutKwargs)
+    finally:
+        for pane, index in current:
+            setEditorTab(pane, index)
+    return [nui for _, _, nui, _ in tabs]
 
 
-NodeEditorUI().layout()
+def _teardown():
+    """Finish any running moves before this module is unloaded"""
+    finishAppliers()
@@ -0,0 +1,450 @@
+"""Lay out the node editor tabs and bookmarks of scene files without a UI
+
+Headless layout reads the connections straight from the DG, and guesses
+the size of each node from its type instead of measuring a Qt item. The
+positions are written into the nodeGraphEditorInfo nodes that store the
+node editor's saved tabs and bookmarks, so they show up the next time the
+scene is opened in the node editor.
+
+Run it with mayapy over a folder of scenes:
+
+    mayapy -m mayaAlignNodes.batch /path/to/scenes --processes 8
+
+Or check that it reads and writes the editor info nodes of the installed
+maya version:
+
+    mayapy -m mayaAlignNodes.batch --check
+"""
+import argparse
+import fnmatch
+import multiprocessing
+import os
+import re
+import time
+
+from .alignNodesLib import NodeEditorUI
+from .capture import ReplayItem, readCapture
+from .utils import lazyImport
+
+cmds = lazyImport("maya.cmds")
+
+# The plug a node is connected into on an editor info node. listConnections
+# gives the long attribute names, but match the short ones too
+_NODE_INFO_RE = re.compile(
+    r"\.(?:tgi|tabGraphInfo)\[(\d+)\]\.(?:ni|nodeInfo)\[(\d+)\]\.(?:dn|dependNode)$"
+)
+
+
+class NodeSizeEstimator(object):
+    """Guess the size a node is drawn at in the node editor
+
+    Nodes are drawn with their name in them, so without a measured size for
+    their type, the width is worked out from the length of the name
+
+    Arguments:
+        typeSizes (dict, optional): {typeName: (width, height)} measured sizes
+    """
+
+    charWidth = 7.0
+    padding = 40.0
+    minWidth = 120.0
+    height = 40.0
+
+    def __init__(self, typeSizes=None):
+        self.typeSizes = dict(typeSizes or {})
+
+    @classmethod
+    def fromCapture(cls, path):
+        """Use the median size of each node type in a capture file"""
+        data = readCapture(path)
+        sizes = {}
+        for typeName, rect in zip(data["types"], data["rects"]):
+            sizes.setdefault(typeName, []).append((rect[2], rect[3]))
+        typeSizes = {}
+        for typeName, wh in sizes.items():
+            ws = sorted(w for w, h in wh)
+            hs = sorted(h for w, h in wh)
+            typeSizes[typeName] = (ws[len(ws) // 2], hs[len(hs) // 2])
+        return cls(typeSizes)
+
+    def size(self, name, typeName):
+        """Get the (width, height) of a node"""
+        ret = self.typeSizes.get(typeName)
+        if ret is not None:
+            return ret
+        shortName = name.rsplit("|", 1)[-1]
+        width = max(self.minWidth, self.charWidth * len(shortName) + self.padding)
+        return width, self.height
+
+
+class HeadlessEditorUI(NodeEditorUI):
+    """A NodeEditorUI for a list of nodes that doesn't need a node editor
+
+    The connections, attribute order, and node types come from the DG. Every
+    node is treated as if it's shown without its attributes, so the plug
+    connections all sit in the middle of the nodes. The results are on the
+    stand-in items, and getCurrentState() gets them
+
+    Arguments:
+        nodeNames (list): The nodes to lay out
+        sizer (NodeSizeEstimator, optional): Guesses the node sizes
+    """
+
+    def __init__(self, nodeNames, sizer=None):
+        super(HeadlessEditorUI, self).__init__()
+        self._name = "headlessNodeEditorEd"
+        self._nodeNames = cmds.ls(nodeNames, long=True) or []
+        sizer = sizer or NodeSizeEstimator()
+        types = self.getNodeTypes(self._nodeNames)
+        self._items = {}
+        for n in self._nodeNames:
+            w, h = sizer.size(n, types.get(n))
+            self._items[n] = ReplayItem(0.0, 0.0, w, h)
+
+    def _getCurrentView(self):
+        raise RuntimeError("A headless node editor has no view")
+
+    def getAllNodeNames(self):
+        return list(self._nodeNames)
+
+    def getAllNodeObjects(self, allNodeNames=None):
+        allNodeNames = allNodeNames or self.getAllNodeNames()
+        return {n: self._items[n] for n in allNodeNames if n in self._items}
+
+    def getTopLevelAttrNames(self, allNodeObjects=None):
+        """Get the connected top-level input attributes of each node in the
+        order maya lists them, which is the order the node editor shows them
+        """
+        allNodeObjects = allNodeObjects or self.getAllNodeObjects()
+        ret = {}
+        for n in allNodeObjects:
+            aliases = self.getAliases(n)
+            connected = set()
+            for dstPlug, srcPlug in self.getIncomingPlugs(n):
+                dstPlug = aliases.get(dstPlug, dstPlug)
+                connected.add(dstPlug.split(".", 2)[1].split("[", 1)[0])
+            if not connected:
+                ret[n] = []
+                continue
+            order = {a: i for i, a in enumerate(cmds.listAttr(n) or [])}
+            ret[n] = sorted(connected, key=lambda a: (order.get(a, len(order)), a))
+        return ret
+
+    def getPlugOffsets(self, allNodeObjects=None):
+        allNodeObjects = allNodeObjects or self.getAllNodeObjects()
+        return {n: {} for n in allNodeObjects}
+
+    def applyItemPositions(self, moves, merge=False):
+        """Move the stand-in items right away, because there's no editor to
+        keep responsive, or undo to merge into
+        """
+        for item, x, y in moves:
+            item.setPos(x, y)
+
+    def layoutSelected(self):
+        raise RuntimeError("Can't lay out the selection of a headless node editor")
+
+
+def getEditorTabs():
+    """Get the nodes in every saved node editor tab and bookmark in the scene
+
+    Returns:
+        dict: {(infoNode, tabIndex): {nodeIndex: nodeName}}
+    """
+    ret = {}
+    for info in cmds.ls(type="nodeGraphEditorInfo") or []:
+        cnx = cmds.listConnections(
+            info, source=True, destination=False, plugs=True, connections=True
+        )
+        cnx = cnx or []
+        for dstPlug, srcPlug in zip(cnx[::2], cnx[1::2]):
+            m = _NODE_INFO_RE.search(dstPlug)
+            if m is None:
+                continue
+            node = cmds.ls(srcPlug.split(".", 1)[0], long=True)
+            if node:
+                tab = ret.setdefault((info, int(m.group(1))), {})
+                tab[int(m.group(2))] = node[0]
+    return ret
+
+
+def writeTab(info, tab, positions, nodeIndices=None, margin=50.0):
+    """Write node positions into a node editor info tab
+
+    Arguments:
+        info (str): The nodeGraphEditorInfo node
+        tab (int): The tabGraphInfo index
+        positions (dict): {nodeName: (x, y, w, h)} in node editor scene space
+        nodeIndices (dict, optional): {nodeName: nodeInfoIndex} of nodes that
+            are already in the tab. Any other nodes are added to the end
+        margin (float): The space to leave around the nodes in the saved view
+    """
+    nodeIndices = dict(nodeIndices or {})
+    prefix = "{0}.tgi[{1}]".format(info, tab)
+    nextIdx = max(nodeIndices.values()) + 1 if nodeIndices else 0
+    for name in sorted(positions):
+        if name not in nodeIndices:
+            nodeIndices[name] = nextIdx
+            cmds.connectAttr(
+                name + ".message", "{0}.ni[{1}].dn".format(prefix, nextIdx), force=True
+            )
+            nextIdx += 1
+
+    # The saved positions have Y going up, but the scene has Y going down
+    left, top, right, bottom = None, None, None, None
+    for name, (x, y, w, h) in positions.items():
+        idx = nodeIndices[name]
+        cmds.setAttr("{0}.ni[{1}].x".format(prefix, idx), x)
+        cmds.setAttr("{0}.ni[{1}].y".format(prefix, idx), -y)
+        left = x if left is None else min(left, x)
+        top = y if top is None else min(top, y)
+        right = x + w if right is None else max(right, x + w)
+        bottom = y + h if bottom is None else max(bottom, y + h)
+
+    if left is not None:
+        low = (left - margin, -bottom - margin)
+        high = (right + margin, -top + margin)
+        cmds.setAttr(prefix + ".vl", *low, type="double2")
+        cmds.setAttr(prefix + ".vh", *high, type="double2")
+
+
+def createBookmark(name):
+    """Make a new, empty node editor bookmark
+
+    Returns:
+        tuple: The (infoNode, tabIndex) of the bookmark's tab
+    """
+    info = cmds.createNode("nodeGraphEditorInfo", name=name, skipSelect=True)
+    cmds.setAttr(info + ".tgi[0].tn", name, type="string")
+    return info, 0
+
+
+def getSceneNodes():
+    """Get every connected node in the scene that isn't a default node"""
+    defaults = set(cmds.ls(defaultNodes=True, long=True) or [])
+    defaults.update(cmds.ls(type="nodeGraphEditorInfo", long=True) or [])
+    return [
+        n
+        for n in cmds.ls(long=True) or []
+        if n not in defaults and cmds.listConnections(n, shapes=True)
+    ]
+
+
+def layoutTabs(sizer=None, createName=None, **layoutKwargs):
+    """Lay out every node editor tab and bookmark in the open scene
+
+    Arguments:
+        sizer (NodeSizeEstimator, optional): Guesses the node sizes
+        createName (str, optional): If the scene has no tabs or bookmarks, make
+            a bookmark with this name holding every connected non-default node
+        layoutKwargs: Passed on to NodeEditorUI.layout
+
+    Returns:
+        int: The number of tabs that were laid out
+    """
+    # (infoNode, tabIndex, nodeNames, {nodeName: nodeInfoIndex})
+    jobs = []
+    for (info, tab), indices in sorted(getEditorTabs().items()):
+        nodeIndices = {name: idx for idx, name in indices.items()}
+        jobs.append((info, tab, sorted(nodeIndices), nodeIndices))
+    if not jobs and createName:
+        nodes = getSceneNodes()
+        if nodes:
+            info, tab = createBookmark(createName)
+            jobs.append((info, tab, nodes, {}))
+
+    for info, tab, nodeNames, nodeIndices in jobs:
+        nui = HeadlessEditorUI(nodeNames, sizer=sizer)
+        nui.layout(**layoutKwargs)
+        writeTab(info, tab, nui.getCurrentState(), nodeIndices=nodeIndices)
+    return len(jobs)
+
+
+def layoutScene(path, outDir=None, sizer=None, createName=None):
+    """Open a scene, lay out its node editor tabs and bookmarks, and save it
+
+    Arguments:
+        path (str): The scene file
+        outDir (str, optional): Save the scene into this folder instead of
+            over the original
+        sizer (NodeSizeEstimator, optional): Guesses the node sizes
+        createName (str, optional): See layoutTabs
+
+    Returns:
+        dict: The seconds taken to "open", "layout", and "save" the scene
+        int: The number of tabs that were laid out
+    """
+    times = {}
+    start = time.perf_counter()
+    cmds.file(path, open=True, force=True, prompt=False)
+    times["open"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    count = layoutTabs(sizer=sizer, createName=createName)
+    times["layout"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if count:
+        fileType = cmds.file(query=True, type=True)[0]
+        if outDir:
+            cmds.file(rename=os.path.join(outDir, os.path.basename(path)))
+        cmds.file(save=True, force=True, type=fileType)
+    times["save"] = time.perf_counter() - start
+    return times, count
+
+
+def _initWorker():
+    """Start maya in a pool process"""
+    import maya.standalone
+
+    maya.standalone.initialize(name="python")
+
+
+def _processScene(args):
+    """Run layoutScene in a pool process, catching any errors so one bad
+    scene doesn't stop the batch
+
+    Returns:
+        tuple: (path, times, tabCount, errorMessage)
+    """
+    path = args[0]
+    try:
+        times, count = layoutScene(*args)
+    except Exception as e:
+        return path, {}, 0, "{0}: {1}".format(type(e).__name__, e)
+    return path, times, count, None
+
+
+def findScenes(folder, patterns=("*.ma", "*.mb")):
+    """Get every scene file under a folder, sorted"""
+    ret = []
+    for root, dirs, files in os.walk(folder):
+        for f in files:
+            if any(fnmatch.fnmatch(f, p) for p in patterns):
+                ret.append(os.path.join(root, f))
+    return sorted(ret)
+
+
+def batchLayout(paths, processes=None, outDir=None, sizer=None, createName=None):
+    """Lay out the node editor tabs of many scenes in a pool of maya processes,
+    printing the time each one takes
+
+    Arguments:
+        paths (list): The scene files
+        processes (int, optional): The number of maya processes to run. Defaults
+            to the number of CPUs. With 1, the scenes are done in this process
+        outDir (str, optional): See layoutScene
+        sizer (NodeSizeEstimator, optional): Guesses the node sizes
+        createName (str, optional): See layoutTabs
+
+    Returns:
+        list: The (path, times, tabCount, errorMessage) of each scene
+    """
+    jobs = [(p, outDir, sizer, createName) for p in paths]
+    if outDir and not os.path.isdir(outDir):
+        os.makedirs(outDir)
+
+    header = "{0:>8}{1:>8}{2:>8}{3:>6}  {4}"
+    row = "{0:8.2f}{1:8.2f}{2:8.2f}{3:6d}  {4}"
+    print(header.format("open", "layout", "save", "tabs", "file"))
+    start = time.perf_counter()
+    results = []
+    pool = None
+    if processes == 1:
+        _initWorker()
+        it = map(_processScene, jobs)
+    else:
+        pool = multiprocessing.Pool(processes=processes, initializer=_initWorker)
+        it = pool.imap_unordered(_processScene, jobs)
+    try:
+        for path, times, count, error in it:
+            results.append((path, times, count, error))
+            if error:
+                print("{0:>30}  {1}  {2}".format("FAILED", path, error))
+                continue
+            t = [times[k] for k in ("open", "layout", "save")]
+            print(row.format(t[0], t[1], t[2], count, path))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    failed = sum(1 for r in results if r[3])
+    msg = "{0} scenes in {1:.1f} s, {2} failed"
+    print(msg.format(len(results), time.perf_counter() - start, failed))
+    return results
+
+
+def checkTabs():
+    """Check the round trip through a bookmark in a new scene: write a tab,
+    find it again with getEditorTabs, and lay it out with layoutTabs
+
+    Raises:
+        RuntimeError: If any step doesn't give back what it should
+    """
+    cmds.file(new=True, force=True)
+    a = cmds.createNode("transform", name="checkA")
+    b = cmds.createNode("transform", name="checkB")
+    cmds.connectAttr(a + ".translate", b + ".translate")
+    names = cmds.ls([a, b], long=True)
+
+    info, tab = createBookmark("checkBookmark")
+    writeTab(info, tab, {n: (0.0, 0.0, 100.0, 40.0) for n in names})
+    found = getEditorTabs().get((info, tab), {})
+    if sorted(found.values()) != sorted(names):
+        raise RuntimeError("Found {0} in the bookmark, not {1}".format(found, names))
+
+    if layoutTabs() != 1:
+        raise RuntimeError("The bookmark wasn't laid out")
+    xs = {
+        n: cmds.getAttr("{0}.tgi[{1}].ni[{2}].x".format(info, tab, idx))
+        for idx, n in found.items()
+    }
+    if not xs[names[0]] < xs[names[1]]:
+        raise RuntimeError("The upstream isn't left of the downstream: {0}".format(xs))
+    print("Editor tabs check passed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Lay out the node editor tabs and bookmarks of scene files"
+    )
+    parser.add_argument("folder", nargs="?", help="The folder to search for scenes")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", help="Save the scenes here instead of in place")
+    parser.add_argument(
+        "--sizes", help="A capture file to measure the node sizes of each type from"
+    )
+    parser.add_argument(
+        "--create",
+        metavar="NAME",
+        help="Make a bookmark with this name in scenes that don't have any",
+    )
+    parser.add_argument("--pattern", action="append", help="Scene filename patterns")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Check reading and writing editor tabs in a new scene, and exit",
+    )
+    args = parser.parse_args(argv)
+
+    if args.check:
+        _initWorker()
+        checkTabs()
+        return
+    if args.folder is None:
+        parser.error("the folder is required")
+
+    sizer = NodeSizeEstimator.fromCapture(args.sizes) if args.sizes else None
+    patterns = args.pattern or ["*.ma", "*.mb"]
+    batchLayout(
+        findScenes(args.folder, patterns),
+        processes=args.processes,
+        outDir=args.out,
+        sizer=sizer,
+        createName=args.create,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""Benchmarks for the pure algorithm layer
+
+These run without Maya so they can be used on any machine:
+
+    python -m mayaAlignNodes.bench
+"""
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .capture import ReplayEditorUI, readCapture, writeCapture, CAPTURE_VERSION
+from .graph import Graph, SubtreeHasher
+from .layout import straightenLayers
+
+
+def syntheticStreams(nodeCount, branching=3, depth=5, seed=0):
+    """Build a rig-like {node: [upstream nodes]} dict of long DAG paths
+
+    The graph is a forest of trees where each node has up to `branching`
+    upstreams, with a few extra cross-connections inside each tree
+
+    Arguments:
+        nodeCount (int): The total number of nodes to build
+        branching (int): The max number of direct upstreams per node
+        depth (int): The max depth of each tree
+        seed (int): The random seed
+
+    Returns:
+        dict: {nodeFullName: [upstreamFullName, ...]}
+    """
+    rnd = random.Random(seed)
+    ups = {}
+    treeIdx = 0
+    while len(ups) < nodeCount:
+        root = "|rig|body_grp|limb_{0:05d}_grp|setup_grp|ctrl_{0:05d}".format(treeIdx)
+        ups[root] = []
+        frontier = [(root, 0)]
+        members = [root]
+        while frontier and len(ups) < nodeCount:
+            node, d = frontier.pop(0)
+            if d >= depth:
+                continue
+            for b in range(rnd.randint(1, branching)):
+                if len(ups) >= nodeCount:
+                    break
+                child = "{0}|util_{1}_{2}".format(node, d, b)
+                ups[child] = []
+                ups[node].append(child)
+                frontier.append((child, d + 1))
+                members.append(child)
+        # Sprinkle a few extra connections from later nodes into earlier ones
+        # Later nodes are always further upstream, so this stays acyclic
+        for _ in range(len(members) // 10):
+            a, b = sorted(rnd.sample(range(len(members)), 2))
+            ups[members[a]].append(members[b])
+        treeIdx += 1
+    return {k: sorted(set(v)) for k, v in ups.items()}
+
+
+def _legacyClosure(cnx):
+    """The {node: set(all connections)} dicts the old dict/string storage built"""
+    ret = {}
+    for k in cnx:
+        stack = [(k, iter(cnx[k]))]
+        if k in ret:
+            continue
+        ret[k] = set()
+        while stack:
+            node, it = stack[-1]
+            for n in it:
+                if n not in ret:
+                    ret[n] = set()
+                    stack.append((n, iter(cnx[n])))
+                    break
+            else:
+                stack.pop()
+                fts = ret[node]
+                for n in cnx[node]:
+                    fts.add(n)
+                    fts |= ret[n]
+    return ret
+
+
+def _measure(func):
+    """Get the return value, seconds, and retained bytes of calling func
+    The timing is done on a separate run because tracemalloc is slow
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    ret = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ret, elapsed, current
+
+
+def benchGraphMemory(nodeCount=100000):
+    """Compare the memory of the old string dicts with the interned Graph
+
+    Both sides start from the same already-built name strings, so only the
+    cost of the graph structures themselves is measured
+    """
+    ups = syntheticStreams(nodeCount)
+
+    def legacy():
+        downs = {k: [] for k in ups}
+        for k, v in ups.items():
+            for u in v:
+                downs[u].append(k)
+        downs = {k: sorted(v) for k, v in downs.items()}
+        return ups.copy(), downs, _legacyClosure(ups), _legacyClosure(downs)
+
+    def compact():
+        graph = Graph.fromStreams(ups)
+        for i in range(len(graph)):
+            graph.fullUps(i)
+            graph.fullDowns(i)
+        return graph
+
+    legacyData, legacyTime, legacyMem = _measure(legacy)
+    graph, graphTime, graphMem = _measure(compact)
+
+    # Make sure both sides agree before reporting anything
+    sample = random.Random(1).sample(list(ups), 100)
+    for name in sample:
+        idx = graph.index(name)
+        assert set(graph.toNames(graph.fullUps(idx))) == legacyData[2][name]
+
+    print("Graph memory ({0} nodes, {1} edges)".format(len(graph), graph.edgeCount))
+    row = "    {0:<14}{1:8.1f} MB {2:6.2f} s"
+    print(row.format("legacy dicts:", legacyMem / 1e6, legacyTime))
+    print(row.format("Graph:", graphMem / 1e6, graphTime))
+
+
+def syntheticLayers(edgeCount, layerCount=20, seed=0):
+    """Build random layers with plug-level edges between neighbouring layers
+
+    Returns:
+        list: The layers of node ids, top to bottom
+        dict: {node: height}
+        list: (src, srcPlugOffset, dst, dstPlugOffset) edges
+        dict: {node: y} The naive stacked positions
+    """
+    rnd = random.Random(seed)
+    perLayer = max(1, edgeCount // (layerCount * 3 // 2))
+    layers = []
+    nid = 0
+    for _ in range(layerCount):
+        count = rnd.randint(perLayer // 2 + 1, perLayer * 3 // 2 + 1)
+        layers.append(list(range(nid, nid + count)))
+        nid += count
+    heights = {i: rnd.choice([40.0, 80.0, 120.0]) for i in range(nid)}
+
+    edges = []
+    while len(edges) < edgeCount:
+        li = rnd.randint(1, layerCount - 1)
+        src = rnd.choice(layers[li])
+        dst = rnd.choice(layers[li - 1])
+        srcOff = rnd.uniform(0, heights[src])
+        dstOff = rnd.uniform(0, heights[dst])
+        edges.append((src, srcOff, dst, dstOff))
+
+    initial = {}
+    for layer in layers:
+        y = 0.0
+        for n in layer:
+            initial[n] = y
+            y += heights[n] + 50.0
+    return layers, heights, edges, initial
+
+
+def _edgeCost(ys, edges):
+    return sum((ys[s] + so - ys[d] - do) ** 2 for s, so, d, do in edges)
+
+
+def benchStraighten(edgeCount=10000):
+    """Time the least-squares edge straightening pass
+
+    The synthetic edges join random nodes of neighbouring layers, so most of
+    them can't be straightened at once, and the mean squared plug offset only
+    drops by a fifth or so. This measures the time, not the layout quality
+    """
+    layers, heights, edges, initial = syntheticLayers(edgeCount)
+    start = time.perf_counter()
+    ys = straightenLayers(layers, heights, edges, initial)
+    elapsed = time.perf_counter() - start
+    before = _edgeCost(initial, edges) / len(edges)
+    after = _edgeCost(ys, edges) / len(edges)
+    print("Edge straightening ({0} edges)".format(len(edges)))
+    msg = "    {0:6.2f} s, mean squared plug offset {1:.0f} -> {2:.0f} ({3:.1%} less)"
+    print(msg.format(elapsed, before, after, 1.0 - after / before))
+
+
+def syntheticCopies(copies=500, seed=0):
+    """Build a rig of many identical sub-networks, like a per-finger setup
+    repeated over and over, plus a few variations
+
+    Returns:
+        Graph: The graph of the whole rig
+        list: The node ids of each separate network
+    """
+    rnd = random.Random(seed)
+    template = [(1, 0), (2, 0), (3, 1), (4, 1), (5, 2), (6, 3), (7, 3), (8, 5)]
+    names, edges, groups = [], [], []
+    for c in range(copies):
+        prefix = "|rig|hand_grp|finger_{0:04d}|".format(c)
+        # Every tenth network gets an extra random node, making a few more shapes
+        extra = [(9, rnd.randint(0, 8))] if c % 10 == 0 else []
+        count = 10 if extra else 9
+        nodes = [prefix + "util_{0}".format(i) for i in range(count)]
+        names.extend(nodes)
+        edges.extend((nodes[u], nodes[d]) for u, d in template + extra)
+        groups.append(nodes)
+    graph = Graph(names, edges)
+    return graph, [graph.toIds(g) for g in groups]
+
+
+class _EveryCopyUI(ReplayEditorUI):
+    """A replayed editor that lays out every tree in full, by labelling every
+    node differently so no two trees ever share a shape
+    """
+
+    def getShapeHasher(self, plugConnections):
+        return SubtreeHasher(self.graph, lambda i: i, lambda u, d: ())
+
+
+def benchSubtreeReuse(copies=500):
+    """Compare laying out every copy of a network against laying out each
+    distinct shape once and stamping it onto the copies, through the real
+    layoutGraph of a replayed editor
+    """
+    graph, groups = syntheticCopies(copies)
+    data = streamsCapture(graph.upsDict(), lambda n: "plusMinusAverage")
+    times = []
+    for cls in (_EveryCopyUI, ReplayEditorUI):
+        nui = cls(data)
+        # Build the graph and the node objects before timing the layout
+        nui.graph, nui.nodeObjects
+        start = time.perf_counter()
+        trees = nui.layoutGraph()
+        times.append(time.perf_counter() - start)
+
+    print("Subtree reuse ({0} networks)".format(len(trees)))
+    row = "    {0:<14}{1:6.3f} s"
+    print(row.format("every copy:", times[0]))
+    print(row.format("reuse:", times[1]))
+
+
+def syntheticCapture(nodeCount=5000, seed=0):
+    """Build capture data like captureEditor writes from syntheticStreams,
+    with a random node type for every node
+
+    Returns:
+        dict: The capture data
+    """
+    rnd = random.Random(seed)
+    ups = syntheticStreams(nodeCount, seed=seed)
+    return streamsCapture(
+        ups, lambda n: rnd.choice(["multiplyDivide", "plusMinusAverage"])
+    )
+
+
+def streamsCapture(ups, nodeType):
+    """Build capture data from a {node: [upstream nodes]} dict
+
+    Every node gets a few numbered input attributes and one output, and each
+    upstream connects into the next free input. The nodes start out in a
+    grid in name order
+
+    Arguments:
+        ups (dict): {nodeFullName: [upstreamFullName, ...]}
+        nodeType (callable): Gets the node type of a node name
+
+    Returns:
+        dict: The capture data
+    """
+    names = sorted(ups)
+    inputCount = max(len(v) for v in ups.values()) + 1
+    attrs = ["input{0}".format(i) for i in range(inputCount)] + ["output"]
+    offsets = {a: 30.0 + 15.0 * i for i, a in enumerate(attrs)}
+    height = 30.0 + 15.0 * len(attrs)
+
+    inputs = []
+    for n in names:
+        inputs.append(
+            [["{0}.input{1}".format(n, j), u + ".output"] for j, u in enumerate(ups[n])]
+        )
+    return {
+        "version": CAPTURE_VERSION,
+        "editor": "syntheticNodeEditorEd",
+        "nodes": names,
+        "types": [nodeType(n) for n in names],
+        "containers": [""] * len(names),
+        "rects": [
+            [200.0 * (i // 50), (height + 25.0) * (i % 50), 150.0, height]
+            for i in range(len(names))
+        ],
+        "attrs": [attrs] * len(names),
+        "offsetTable": [offsets],
+        "offsets": [0] * len(names),
+        "inputs": inputs,
+        "aliases": {},
+    }
+
+
+def printMetrics(before, after, labels=("before", "after")):
+    """Print the layoutMetrics of a graph before and after a layout"""
+    print("    {0:<18}{1:>16}{2:>16}".format("", *labels))
+    for key in ("crossings", "overlaps", "totalEdgeLength", "maxEdgeLength", "area"):
+        print("    {0:<18}{1:16.0f}{2:16.0f}".format(key, before[key], after[key]))
+
+
+def benchReplay(paths=None, nodeCount=5000):
+    """Time replaying captured node editors through the layout pipeline
+
+    Arguments:
+        paths (list, optional): The capture files to replay. Without any,
+            a synthetic capture of `nodeCount` nodes is used
+    """
+    tmpDir = None
+    if not paths:
+        tmpDir = tempfile.mkdtemp()
+        paths = [os.path.join(tmpDir, "synthetic.json.gz")]
+        writeCapture(paths[0], syntheticCapture(nodeCount))
+
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            nui = ReplayEditorUI(readCapture(path))
+            loadTime = time.perf_counter() - start
+            before = nui.getMetrics()
+            start = time.perf_counter()
+            nui.layout()
+            layoutTime = time.perf_counter() - start
+            start = time.perf_counter()
+            after = nui.getMetrics()
+            metricsTime = time.perf_counter() - start
+
+            graph = nui.graph
+            msg = "Replay {0} ({1} nodes, {2} edges)"
+            print(msg.format(os.path.basename(path), len(graph), graph.edgeCount))
+            row = "    {0:<14}{1:6.3f} s"
+            print(row.format("load:", loadTime))
+            print(row.format("layout:", layoutTime))
+            print(row.format("metrics:", metricsTime))
+            printMetrics(before, after)
+    finally:
+        if tmpDir is not None:
+            shutil.rmtree(tmpDir)
+
+
+def benchCompaction(nodeCount=5000):
+    """Compare the same synthetic layout with and without compaction"""
+    nui = ReplayEditorUI(syntheticCapture(nodeCount))
+    results = []
+    for compact in (False, True):
+        nui.reset()
+        start = time.perf_counter()
+        nui.layout(compact=compact)
+        results.append((time.perf_counter() - start, nui.getMetrics()))
+
+    before, after = nui.compaction
+    msg = "Compaction ({0} nodes, {1:.1%} less area in the compacted trees)"
+    print(msg.format(len(nui.graph), 1.0 - after / before if before else 0.0))
+    row = "    {0:<14}{1:6.3f} s"
+    print(row.format("layout:", results[0][0]))
+    print(row.format("compacted:", results[1][0]))
+    printMetrics(results[0][1], results[1][1], labels=("layout", "compacted"))
+
+
+_IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+__import__({0!r})
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("maya", "PySide2", "shiboken2") if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def benchImportTime(
+    modules=("graph", "layout", "resolver", "alignNodesLib", "capture"), runs=5
+):
+    """Time importing each module in a fresh interpreter, and check that none
+    of them drag Maya or Qt in with them
+    """
+    package = __package__
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print("Import time (best of {0} fresh interpreters)".format(runs))
+    for mod in modules:
+        script = _IMPORT_SCRIPT.format(package + "." + mod)
+        best, heavy = None, ""
+        for _ in range(runs):
+            out = subprocess.check_output([sys.executable, "-c", script], cwd=root)
+            elapsed, _, heavy = out.decode().strip().partition(" ")
+            elapsed = float(elapsed)
+            best = elapsed if best is None else min(best, elapsed)
+        note = "  loads " + heavy if heavy else ""
+        print("    {0:<14}{1:7.1f} ms{2}".format(mod + ":", best * 1000, note))
+
+
+def main(argv=None):
+    """Run every benchmark, or only replay the capture files given on the
+    command line:
+
+        python -m mayaAlignNodes.bench rig.json.gz other.json.gz
+    """
+    paths = sys.argv[1:] if argv is None else argv
+    if paths:
+        benchReplay(paths)
+        return
+    benchImportTime()
+    benchGraphMemory()
+    benchStraighten()
+    benchSubtreeReuse()
+    benchReplay()
+    benchCompaction()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Capture what a node editor shows to a file, and replay it without Maya
+
+A capture holds everything the layout pipeline reads from maya and Qt: the
+node names and types, their rects, the displayed attribute order and plug
+offsets, and the plug connections between the nodes. Replaying a capture
+runs the real NodeEditorUI layout code on stand-in items, so production
+graphs can be profiled on any machine:
+
+    from mayaAlignNodes.capture import loadCapture
+    nui = loadCapture("rig.json.gz")
+    nui.layout()
+    print(nui.getCurrentState())
+"""
+import gzip
+import json
+
+from .alignNodesLib import NodeEditorUI
+from .graph import Graph
+
+CAPTURE_VERSION = 1
+
+
+def captureEditor(path, nui=None):
+    """Write the current node editor to a capture file
+
+    Arguments:
+        path (str): The file to write. It's always gzipped json
+        nui (NodeEditorUI, optional): The editor to capture. Defaults to the
+            current node editor
+
+    Returns:
+        dict: The captured data
+    """
+    nui = nui or NodeEditorUI()
+    names = sorted(nui.getAllNodeNames())
+    nameSet = set(names)
+    nodeObjects = nui.getAllNodeObjects(allNodeNames=names)
+    names = [n for n in names if n in nodeObjects]
+
+    state = nui.getCurrentState(nodeDict=nodeObjects)
+    attrs = nui.getTopLevelAttrNames(allNodeObjects=nodeObjects)
+    offsets = nui.getPlugOffsets(allNodeObjects=nodeObjects)
+    types = nui.getNodeTypes(names)
+
+    # Nodes of the same type and display share their offsets, so only
+    # store each distinct one once
+    offsetTable, offsetIdx = [], {}
+    nodeOffsets = []
+    for n in names:
+        key = tuple(sorted(offsets.get(n, {}).items()))
+        if key not in offsetIdx:
+            offsetIdx[key] = len(offsetTable)
+            offsetTable.append(dict(key))
+        nodeOffsets.append(offsetIdx[key])
+
+    # Only keep the connections that stay inside the editor
+    inputs, aliases = [], {}
+    for n in names:
+        pairs = nui.getIncomingPlugs(n)
+        inputs.append([[d, s] for d, s in pairs if s.split(".")[0] in nameSet])
+        nodeAliases = nui.getAliases(n)
+        if nodeAliases:
+            aliases[n] = nodeAliases
+
+    data = {
+        "version": CAPTURE_VERSION,
+        "editor": nui.name,
+        "nodes": names,
+        "types": [types.get(n) for n in names],
+        "containers": nui.getContainers(names),
+        "rects": [list(state[n]) for n in names],
+        "attrs": [attrs.get(n, []) for n in names],
+        "offsetTable": offsetTable,
+        "offsets": nodeOffsets,
+        "inputs": inputs,
+        "aliases": aliases,
+    }
+    writeCapture(path, data)
+    return data
+
+
+def writeCapture(path, data):
+    """Write captured data to a gzipped json file"""
+    with gzip.open(path, "wb") as f:
+        f.write(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def readCapture(path):
+    """Read the captured data from a file written by captureEditor"""
+    with gzip.open(path, "rb") as f:
+        data = json.loads(f.read().decode("utf-8"))
+    if data.get("version") != CAPTURE_VERSION:
+        raise ValueError(
+            "Unsupported capture version {0} in {1}".format(data.get("version"), path)
+        )
+    return data
+
+
+def loadCapture(path):
+    """Get a ReplayEditorUI for a capture file"""
+    return ReplayEditorUI(readCapture(path))
+
+
+class ReplayPoint(object):
+    """The parts of QPointF that the layout code uses"""
+
+    def __init__(self, x, y):
+        self._x, self._y = x, y
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+
+class ReplayRect(object):
+    """The parts of QRectF that the layout code uses"""
+
+    def __init__(self, x, y, w, h):
+        self._x, self._y, self._w, self._h = x, y, w, h
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+    def width(self):
+        return self._w
+
+    def height(self):
+        return self._h
+
+    def left(self):
+        return self._x
+
+    def top(self):
+        return self._y
+
+    def right(self):
+        return self._x + self._w
+
+    def bottom(self):
+        return self._y + self._h
+
+
+class ReplayItem(object):
+    """A stand-in for a node editor QGraphicsItem
+
+    The item's position is the top-left of its scene bounding rect
+    """
+
+    def __init__(self, x, y, w, h):
+        self._x, self._y = x, y
+        self._w, self._h = w, h
+
+    def pos(self):
+        return ReplayPoint(self._x, self._y)
+
+    def setPos(self, x, y):
+        self._x, self._y = x, y
+
+    def setX(self, x):
+        self._x = x
+
+    def setY(self, y):
+        self._y = y
+
+    def moveBy(self, dx, dy):
+        self._x += dx
+        self._y += dy
+
+    def sceneBoundingRect(self):
+        return ReplayRect(self._x, self._y, self._w, self._h)
+
+
+class ReplayEditorUI(NodeEditorUI):
+    """A NodeEditorUI that reads everything from captured data instead of
+    maya and Qt, so the layout pipeline can run anywhere
+
+    Each layout moves the stand-in items, so getCurrentState() gets the
+    result. Laying out only the selection isn't supported, because there's
+    no selection to replay
+
+    Arguments:
+        data (dict): The captured data, from readCapture
+    """
+
+    def __init__(self, data):
+        super(ReplayEditorUI, self).__init__()
+        self._data = data
+        self._name = data["editor"]
+        self._index = {n: i for i, n in enumerate(data["nodes"])}
+        self._items = {n: ReplayItem(*data["rects"][i]) for n, i in self._index.items()}
+
+    def _getCurrentView(self):
+        raise RuntimeError("A replayed node editor has no view")
+
+    def reset(self):
+        """Put every node back where it was captured"""
+        for n, i in self._index.items():
+            self._items[n].setPos(*self._data["rects"][i][:2])
+
+    def getAllNodeNames(self):
+        return list(self._data["nodes"])
+
+    def getGraph(self, allNodeNames=None):
+        allNodeNames = allNodeNames or self.getAllNodeNames()
+        edges = []
+        for n in allNodeNames:
+            edges.extend((s.split(".")[0], n) for d, s in self.getIncomingPlugs(n))
+        return Graph(allNodeNames, edges)
+
+    def getAllNodeObjects(self, allNodeNames=None):
+        allNodeNames = allNodeNames or self.getAllNodeNames()
+        return {n: self._items[n] for n in allNodeNames if n in self._items}
+
+    def getTopLevelAttrNames(self, allNodeObjects=None):
+        allNodeObjects = allNodeObjects or self.getAllNodeObjects()
+        attrs = self._data["attrs"]
+        return {n: list(attrs[self._index[n]]) for n in allNodeObjects}
+
+    def getNodeTypes(self, allNodeNames):
+        types = self._data["types"]
+        return {n: types[self._index[n]] for n in allNodeNames if n in self._index}
+
+    def getContainers(self, allNodeNames):
+        containers = self._data["containers"]
+        return [containers[self._index[n]] for n in allNodeNames]
+
+    def getPlugOffsets(self, allNodeObjects=None):
+        allNodeObjects = allNodeObjects or self.getAllNodeObjects()
+        table, offsets = self._data["offsetTable"], self._data["offsets"]
+        return {n: table[offsets[self._index[n]]] for n in allNodeObjects}
+
+    def getIncomingPlugs(self, node):
+        idx = self._index.get(node)
+        if idx is None:
+            return []
+        return [tuple(p) for p in self._data["inputs"][idx]]
+
+    def getAliases(self, node):
+        return self._data["aliases"].get(node, {})
+
+    def applyItemPositions(self, moves, merge=False):
+        """Move the stand-in items right away, because there's no editor to
+        keep responsive, or undo to merge into
+        """
+        for item, x, y in moves:
+            item.setPos(x, y)
+
+    def layoutSelected(self):
+        raise RuntimeError("Can't lay out the selection of a replayed node editor")
@@ -1,10 +1,19 @@
+"""Click through the node editor to explore the connections of a node
+
+Unlike the layout modules, this one is UI code that only runs inside Maya,
+so it imports Maya and Qt right away
+"""
 from maya import OpenMaya as om, cmds
-from PySide2.QtWidgets import QGraphicsSceneMouseEvent, QListWidget
+from PySide2.QtWidgets import QGraphicsItem, QGraphicsSceneMouseEvent, QListWidget
 from PySide2.QtCore import QObject, Qt, QPoint
 from PySide2.QtGui import QCursor
 import shiboken2
 from functools import partial
 
+from .alignNodesLib import NodeEditorUI
+from .graph import boundedBfs
+from .resolver import getResolver
+
 
 def clickMenu(funcs, wid, item):
     funcs[wid.row(item)]()
@@ -34,13 +43,142 @@ def showMenu(keys, funcs, side, par):
     return menu
 
 
+def plugKey(plug):
+    """Get the full long attribute path of a plug, with indices but no node name"""
+    return plug.partialName(False, False, False, False, True, True)
+
+
+def plugAncestors(plug):
+    """Yield the plug and each of its parent/array plugs up to the top level"""
+    yield plug
+    while True:
+        if plug.isChild():
+            plug = plug.parent()
+        elif plug.isElement():
+            plug = plug.array()
+        else:
+            return
+        yield plug
+
+
+class ConnectionIndex(object):
+    """Map every compound/array plug of a node to the nodes connected under it
+
+    The index for a node is built the first time one of its plugs is queried
+    and thrown away when a connection on that node changes
+    """
+
+    def __init__(self):
+        self._index = {}  # {uuid: {plugKey: ([inputNodes], [outputNodes])}}
+        self._callbacks = {}  # {uuid: [callbackIds]}
+
+    def clear(self):
+        for cbs in self._callbacks.values():
+            for cb in cbs:
+                om.MMessage.removeCallback(cb)
+        self._callbacks = {}
+        self._index = {}
+
+    def _drop(self, uuid):
+        self._index.pop(uuid, None)
+
+    def _onAttrChanged(self, msg, plug, otherPlug, uuid):
+        mask = om.MNodeMessage.kConnectionMade | om.MNodeMessage.kConnectionBroken
+        if msg & mask:
+            self._drop(uuid)
+
+    def _onRemoved(self, node, modifier, uuid):
+        self._drop(uuid)
+        for cb in self._callbacks.pop(uuid, []):
+            om.MMessage.removeCallback(cb)
+
+    def _build(self, node):
+        """Walk every connected plug on the node once, and file its connected
+        nodes under the plug and all of its ancestors
+        """
+        fn = om.MFnDependencyNode(node)
+        nodeplugs = om.MPlugArray()
+        fn.getConnections(nodeplugs)
+        index = {}
+        for i in range(nodeplugs.length()):
+            plug = nodeplugs[i]
+            inCnx = om.MPlugArray()
+            outCnx = om.MPlugArray()
+            plug.connectedTo(inCnx, True, False)
+            plug.connectedTo(outCnx, False, True)
+            ins = [inCnx[j].node() for j in range(inCnx.length())]
+            outs = [outCnx[j].node() for j in range(outCnx.length())]
+            for anc in plugAncestors(plug):
+                entry = index.setdefault(plugKey(anc), ([], []))
+                entry[0].extend(ins)
+                entry[1].extend(outs)
+        return index
+
+    def query(self, plug):
+        """Get the names of the nodes connected at or under the given plug
+
+        Returns:
+            list: The upstream node names
+            list: The downstream node names
+        """
+        node = plug.node()
+        fn = om.MFnDependencyNode(node)
+        uuid = fn.uuid().asString()
+        index = self._index.get(uuid)
+        if index is None:
+            index = self._build(node)
+            self._index[uuid] = index
+            if uuid not in self._callbacks:
+                self._callbacks[uuid] = [
+                    om.MNodeMessage.addAttributeChangedCallback(
+                        node, self._onAttrChanged, uuid
+                    ),
+                    om.MNodeMessage.addNodePreRemovalCallback(
+                        node, self._onRemoved, uuid
+                    ),
+                ]
+
+        ins, outs = index.get(plugKey(plug), ([], []))
+        inputs, outputs = [], []
+        for n in ins:
+            fn.setObject(n)
+            inputs.append(fn.name())
+        for n in outs:
+            fn.setObject(n)
+            outputs.append(fn.name())
+        return inputs, outputs
+
+
 class MyFilter(QObject):
-    def __init__(self, name, scene):
+    """Show add/remove menus for the nodes connected to a right-clicked plug
+
+    Arguments:
+        name (str): The node editor name
+        scene (QGraphicsView): The graph view to show the menus in
+        nui (NodeEditorUI, optional): Used to place newly added nodes next
+            to the clicked plug. Without it, new nodes are left where the
+            editor puts them
+    """
+
+    # How far out from the clicked plug to expand
+    maxHops = 1
+    # The most nodes to add or remove in one click
+    maxNodes = 200
+    # Only expand through these node types. None means any type
+    nodeTypes = None
+
+    hSpacing = 100
+    vSpacing = 20
+
+    def __init__(self, name, scene, nui=None):
         super(MyFilter, self).__init__()
         self._edname = name
         self._scene = scene
+        self._nui = nui
         self._inMenu = None
         self._outMenu = None
+        self._anchor = None
+        self._cnxIndex = ConnectionIndex()
 
     def eventFilter(self, obj, event):
         if isinstance(event, QGraphicsSceneMouseEvent):
@@ -60,16 +198,20 @@ class MyFilter(QObject):
                     self.clearMenu(self._outMenu)
                     pn = plug.split(".", 1)[-1]
 
-                    inputs, outputs = self.getAllConnections(plug)
+                    self._anchor = event.scenePos()
+                    inputs, outputs = self.expand(plug, not shift)
                     if inputs:
                         key = "{2}.{0} ({1})".format(pn, len(inputs), addRem)
                         self._inMenu = showMenu(
-                            [key], [lambda: func(inputs)], "left", self._scene
+                            [key], [lambda: func(inputs, "left")], "left", self._scene
                         )
                     if outputs:
                         key = "{2}.{0} ({1})".format(pn, len(outputs), addRem)
                         self._outMenu = showMenu(
-                            [key], [lambda: func(outputs)], "right", self._scene
+                            [key],
+                            [lambda: func(outputs, "right")],
+                            "right",
+                            self._scene,
                         )
                     return True
 
@@ -88,72 +230,164 @@ class MyFilter(QObject):
         an = aliases.get(an, an)
         return ".".join([nn, an])
 
-    @staticmethod
-    def isPlugChildOf(par, child):
-        if par == child:
-            return True
-        while True:
-            if child.isChild():
-                child = child.parent()
-            elif child.isElement():
-                child = child.array()
-            else:
+    def getAllConnections(self, plug):
+        clickPlug = getResolver().getPlug(plug)
+        if clickPlug is None:
+            return [], []
+        return self._cnxIndex.query(clickPlug)
+
+    def getEditorNodes(self):
+        nodes = cmds.nodeEditor(self._edname, getNodeList=True, query=True) or []
+        return set(cmds.ls(nodes, long=True))
+
+    def expand(self, plug, inEditor=False):
+        """Collect the nodes up to `maxHops` away from the given plug
+        in both directions
+
+        Arguments:
+            plug (str): The clicked plug
+            inEditor (bool): Only expand through nodes already in the editor.
+                This is used when removing nodes
+
+        Returns:
+            list: (node, hop) pairs upstream of the plug
+            list: (node, hop) pairs downstream of the plug
+        """
+        inputs, outputs = self.getAllConnections(plug)
+        origin = cmds.ls(plug.split(".", 1)[0], long=True)
+        editorNodes = self.getEditorNodes() if inEditor else None
+
+        def accept(node):
+            if editorNodes is not None and node not in editorNodes:
                 return False
-            if par == child:
-                return True
-
-    @classmethod
-    def getAllConnections(cls, plug):
-        sl = om.MSelectionList()
-        sl.add(plug)
-        clickPlug = om.MPlug()
-        sl.getPlug(0, clickPlug)
-
-        node = om.MObject()
-        sl.getDependNode(0, node)
-        fn = om.MFnDependencyNode(node)
-        nodeplugs = om.MPlugArray()
-        fn.getConnections(nodeplugs)
-        inputs, outputs = [], []
+            if self.nodeTypes is not None:
+                return cmds.nodeType(node) in self.nodeTypes
+            return True
 
-        for i in range(nodeplugs.length()):
-            plug = nodeplugs[i]
-            if cls.isPlugChildOf(clickPlug, plug):
-                inCnx = om.MPlugArray()
-                outCnx = om.MPlugArray()
-                plug.connectedTo(inCnx, True, False)
-                plug.connectedTo(outCnx, False, True)
-                for j in range(inCnx.length()):
-                    fn.setObject(inCnx[j].node())
-                    inputs.append(fn.name())
-                for j in range(outCnx.length()):
-                    fn.setObject(outCnx[j].node())
-                    outputs.append(fn.name())
-        return inputs, outputs
+        ret = []
+        for starts, upstream in ((inputs, True), (outputs, False)):
+
+            def neighbors(node):
+                return cmds.listConnections(
+                    node,
+                    source=upstream,
+                    destination=not upstream,
+                    shapes=True,
+                    fullNodeName=True,
+                ) or []
+
+            starts = cmds.ls(starts, long=True) if starts else []
+            ret.append(
+                boundedBfs(
+                    starts,
+                    neighbors,
+                    maxHops=self.maxHops,
+                    maxNodes=self.maxNodes,
+                    accept=accept,
+                    exclude=origin,
+                )
+            )
+        return ret[0], ret[1]
+
+    def getAnchorItem(self):
+        """Get the node graphics item under the last click"""
+        if self._anchor is None:
+            return None
+        items = self._scene.scene().items(self._anchor)
+        items = [i for i in items if type(i) is QGraphicsItem]
+        return items[0] if items else None
 
-    def addItems(self, items):
+    def placeItems(self, hops, side):
+        """Stack the given nodes in columns by hop, beside the clicked plug
+
+        Arguments:
+            hops (list): (node, hop) pairs of the nodes to place
+            side (str): "left" to place upstreams, "right" for downstreams
+        """
+        anchor = self.getAnchorItem()
+        if self._nui is None or anchor is None or not hops:
+            return
+        nodeDict = self._nui.getAllNodeObjects(allNodeNames=[n for n, _ in hops])
+        columns = {}
+        for n, hop in hops:
+            if n in nodeDict:
+                columns.setdefault(hop, []).append(nodeDict[n])
+
+        rect = anchor.sceneBoundingRect()
+        cy = self._anchor.y()
+        if side == "left":
+            cx = rect.left() - self.hSpacing
+        else:
+            cx = rect.right() + self.hSpacing
+
+        for hop in sorted(columns):
+            col = columns[hop]
+            rects = [i.sceneBoundingRect() for i in col]
+            width = max(r.width() for r in rects)
+            height = sum(r.height() for r in rects) + self.vSpacing * (len(col) - 1)
+            if side == "left":
+                cx -= width
+            y = cy - height / 2.0
+            for item, r in zip(col, rects):
+                item.setPos(cx, y)
+                y += r.height() + self.vSpacing
+            if side == "left":
+                cx -= self.hSpacing
+            else:
+                cx += width + self.hSpacing
+
+    def addItems(self, hops, side):
         self.clearMenu(self._inMenu)
         self.clearMenu(self._outMenu)
-        for i in items:
-            cmds.nodeEditor(self._edname, edit=True, addNode=i)
+        existing = self.getEditorNodes()
+        items = [n for n, _ in hops]
+        new = [(n, hop) for n, hop in hops if n not in existing]
+        if new:
+            # One edit for the whole frontier, and we do the placement ourselves
+            cmds.nodeEditor(
+                self._edname, edit=True, addNode=[n for n, _ in new], layout=False
+            )
+            self.placeItems(new, side)
         cmds.select(items, noExpand=True, replace=True)
 
-    def remItems(self, items):
+    def remItems(self, hops, side):
         self.clearMenu(self._inMenu)
         self.clearMenu(self._outMenu)
-        for i in items:
-            cmds.nodeEditor(self._edname, edit=True, removeNode=i)
+        cmds.nodeEditor(self._edname, edit=True, removeNode=[n for n, _ in hops])
 
 
-if not shiboken2.isValid(nui.scene):
-    nui = NodeEditorUI()
+_FILTER = None
+
+
+def toggleExploreFilter():
+    """Install the plug explorer on the current node editor, or remove it
+    if it's already installed
+
+    Returns:
+        bool: Whether the filter is installed now
+    """
+    global _FILTER
+    if _FILTER is not None:
+        _teardown()
+        print("Removing Event Filter")
+        return False
 
-try:
-    nui.scene.removeEventFilter(ef)
-    print("Removing Event Filter")
-    del ef
-except NameError:
     nui = NodeEditorUI()
-    ef = MyFilter(nui.name, nui.graphView)
-    nui.scene.installEventFilter(ef)
+    _FILTER = MyFilter(nui.name, nui.graphView, nui=nui)
+    nui.scene.installEventFilter(_FILTER)
     print("Adding Event Filter")
+    return True
+
+
+def _teardown():
+    """Remove the event filter and its callbacks before this module is unloaded"""
+    global _FILTER
+    if _FILTER is None:
+        return
+    scene = _FILTER._scene.scene() if shiboken2.isValid(_FILTER._scene) else None
+    if scene is not None:
+        scene.removeEventFilter(_FILTER)
+    _FILTER.clearMenu(_FILTER._inMenu)
+    _FILTER.clearMenu(_FILTER._outMenu)
+    _FILTER._cnxIndex.clear()
+    _FILTER = None
@@ -0,0 +1,451 @@
+"""A compact graph representation for the node editor layout algorithms
+
+Node names are interned once to integer ids, and edges are stored as CSR
+offset/index arrays in both directions. The layout algorithms work on the
+ids, and names only come back out at the API boundary.
+
+This module has no Maya dependency so it can be imported and profiled anywhere
+"""
+from array import array
+
+
+def _buildCsr(count, pairs):
+    """Build CSR offset/index arrays from a sorted list of (row, col) pairs
+
+    Arguments:
+        count (int): The number of rows
+        pairs (list): A sorted, de-duplicated list of (row, col) pairs
+
+    Returns:
+        array: The row offsets. Row `r` lives in indices[offsets[r]:offsets[r+1]]
+        array: The column indices
+    """
+    counts = [0] * (count + 1)
+    for r, _ in pairs:
+        counts[r + 1] += 1
+    for i in range(count):
+        counts[i + 1] += counts[i]
+    offsets = array("i", counts)
+    indices = array("i", [c for _, c in pairs])
+    return offsets, indices
+
+
+def boundedBfs(
+    starts, neighbors, maxHops=1, maxNodes=None, accept=None, exclude=()
+):
+    """Breadth-first search outwards from a group of starting nodes
+
+    Arguments:
+        starts (list): The nodes one hop away from the origin
+        neighbors (callable): Gets the next nodes out from a given node
+        maxHops (int): The number of hops to search. The starts are hop 1
+        maxNodes (int, optional): Stop once this many nodes have been found
+        accept (callable, optional): Nodes that this returns False for are
+            neither collected nor searched through
+        exclude (iterable): Nodes that are never collected, like the origin
+
+    Returns:
+        list: (node, hop) pairs in the order they were found
+    """
+    seen = set(exclude)
+    ret = []
+    frontier = []
+    for n in starts:
+        if n not in seen:
+            seen.add(n)
+            frontier.append(n)
+
+    hop = 1
+    while frontier and hop <= maxHops:
+        nxt = []
+        for n in frontier:
+            if accept is not None and not accept(n):
+                continue
+            ret.append((n, hop))
+            if maxNodes is not None and len(ret) >= maxNodes:
+                return ret
+            if hop == maxHops:
+                continue
+            for m in neighbors(n):
+                if m not in seen:
+                    seen.add(m)
+                    nxt.append(m)
+        frontier = nxt
+        hop += 1
+    return ret
+
+
+class Graph(object):
+    """A directed graph of interned node names
+
+    Ids are assigned in sorted name order, so sorting a list of ids gives
+    the same order as sorting their names
+
+    Edges go from upstream to downstream, the same direction as the
+    connections in maya
+    """
+
+    def __init__(self, names, edges=()):
+        """
+        Arguments:
+            names (iterable): The node names. Duplicates are ignored
+            edges (iterable): (upstreamName, downstreamName) pairs. Edges that
+                reference names that aren't in `names` are ignored
+        """
+        self._names = sorted(set(names))
+        self._ids = {n: i for i, n in enumerate(self._names)}
+
+        pairs = set()
+        ids = self._ids
+        for u, d in edges:
+            iu = ids.get(u)
+            idd = ids.get(d)
+            if iu is not None and idd is not None:
+                pairs.add((iu, idd))
+        self._edgeCount = len(pairs)
+
+        count = len(self._names)
+        self._downOffsets, self._downIndices = _buildCsr(count, sorted(pairs))
+        rpairs = sorted((d, u) for u, d in pairs)
+        self._upOffsets, self._upIndices = _buildCsr(count, rpairs)
+
+        self._compOf = None
+        self._comps = None
+        self._fullUps = None
+        self._fullDowns = None
+
+    @classmethod
+    def fromStreams(cls, ups):
+        """Build a graph from a dict of {node: [upstream nodes]}"""
+        edges = [(u, k) for k, v in ups.items() for u in v]
+        return cls(ups.keys(), edges)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    @property
+    def edgeCount(self):
+        return self._edgeCount
+
+    def index(self, name):
+        """Get the id of a node name"""
+        return self._ids[name]
+
+    def name(self, idx):
+        """Get the name of a node id"""
+        return self._names[idx]
+
+    def toIds(self, names):
+        return [self._ids[n] for n in names]
+
+    def toNames(self, ids):
+        return [self._names[i] for i in ids]
+
+    def ups(self, idx):
+        """Get the sorted direct upstream ids of the given node id"""
+        return self._upIndices[self._upOffsets[idx] : self._upOffsets[idx + 1]]
+
+    def downs(self, idx):
+        """Get the sorted direct downstream ids of the given node id"""
+        return self._downIndices[self._downOffsets[idx] : self._downOffsets[idx + 1]]
+
+    def edges(self):
+        """Iterate over all the (upstream, downstream) id pairs"""
+        offsets, indices = self._downOffsets, self._downIndices
+        for u in range(len(self._names)):
+            for k in range(offsets[u], offsets[u + 1]):
+                yield u, indices[k]
+
+    def sources(self):
+        """Get the ids of the nodes without any upstreams"""
+        offsets = self._upOffsets
+        return [i for i in range(len(self._names)) if offsets[i] == offsets[i + 1]]
+
+    def sinks(self):
+        """Get the ids of the nodes without any downstreams"""
+        offsets = self._downOffsets
+        return [i for i in range(len(self._names)) if offsets[i] == offsets[i + 1]]
+
+    def upsDict(self):
+        """Get the direct upstreams as a dict of {name: [sorted names]}"""
+        return {n: self.toNames(self.ups(i)) for i, n in enumerate(self._names)}
+
+    def downsDict(self):
+        """Get the direct downstreams as a dict of {name: [sorted names]}"""
+        return {n: self.toNames(self.downs(i)) for i, n in enumerate(self._names)}
+
+    def subgraph(self, ids):
+        """Build the induced subgraph of the given node ids"""
+        keep = set(ids)
+        edges = [
+            (self._names[u], self._names[d])
+            for u in keep
+            for d in self.downs(u)
+            if d in keep
+        ]
+        return Graph(self.toNames(keep), edges)
+
+    def quotient(self, groupOf):
+        """Collapse the nodes into one super-node per group
+
+        Arguments:
+            groupOf (list): The group name of each node id
+
+        Returns:
+            Graph: A graph of the group names, with an edge wherever a node in
+                one group connects to a node in another
+        """
+        edges = set()
+        for u, d in self.edges():
+            gu, gd = groupOf[u], groupOf[d]
+            if gu != gd:
+                edges.add((gu, gd))
+        return Graph(groupOf, edges)
+
+    def strongComponents(self):
+        """Find the strongly connected components with an iterative Tarjan
+
+        Returns:
+            array: The component index of each node id
+            list: The lists of node ids in each component. These are ordered
+                so that every component comes after all of its downstreams
+        """
+        if self._comps is not None:
+            return self._compOf, self._comps
+
+        count = len(self._names)
+        offsets, indices = self._downOffsets, self._downIndices
+        index = [-1] * count
+        low = [0] * count
+        onStack = [False] * count
+        stack = []
+        compOf = array("i", [-1]) * count
+        comps = []
+        counter = 0
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            onStack[root] = True
+            work = [[root, offsets[root]]]
+            while work:
+                frame = work[-1]
+                v, pos = frame
+                if pos < offsets[v + 1]:
+                    frame[1] = pos + 1
+                    w = indices[pos]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        onStack[w] = True
+                        work.append([w, offsets[w]])
+                    elif onStack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        onStack[w] = False
+                        compOf[w] = len(comps)
+                        members.append(w)
+                        if w == v:
+                            break
+                    comps.append(members)
+
+        self._compOf, self._comps = compOf, comps
+        return compOf, comps
+
+    def _closure(self, offsets, indices, order):
+        """Build the per-component reachability along one direction
+
+        Returns:
+            list: For each component, a sorted array of every node id reachable
+                from it, not including the component's own members
+        """
+        compOf, comps = self.strongComponents()
+        reach = [None] * len(comps)
+        empty = array("i")
+        for c in order:
+            seen = set()
+            found = set()
+            for v in comps[c]:
+                for k in range(offsets[v], offsets[v + 1]):
+                    oc = compOf[indices[k]]
+                    if oc != c and oc not in seen:
+                        seen.add(oc)
+                        found.update(comps[oc])
+                        found.update(reach[oc])
+            # Most nodes are leaves in one direction, so share the empty array
+            reach[c] = array("i", sorted(found)) if found else empty
+        return reach
+
+    def _full(self, reach, idx):
+        c = self._compOf[idx]
+        members = self._comps[c]
+        if len(members) == 1:
+            return reach[c]
+        return array("i", sorted(set(reach[c]).union(members).difference([idx])))
+
+    def fullDowns(self, idx):
+        """Get a sorted array of every node id downstream of the given node id"""
+        if self._fullDowns is None:
+            _, comps = self.strongComponents()
+            self._fullDowns = self._closure(
+                self._downOffsets, self._downIndices, range(len(comps))
+            )
+        return self._full(self._fullDowns, idx)
+
+    def fullUps(self, idx):
+        """Get a sorted array of every node id upstream of the given node id"""
+        if self._fullUps is None:
+            _, comps = self.strongComponents()
+            self._fullUps = self._closure(
+                self._upOffsets, self._upIndices, range(len(comps) - 1, -1, -1)
+            )
+        return self._full(self._fullUps, idx)
+
+    def cycle(self, idx):
+        """Get the node ids in a cycle with the given node id
+        This is empty if the node isn't part of a cycle
+        """
+        compOf, comps = self.strongComponents()
+        members = comps[compOf[idx]]
+        if len(members) > 1 or idx in self.downs(idx):
+            return members
+        return []
+
+    def components(self):
+        """Get the weakly connected component index of each node id
+
+        Returns:
+            array: The component index of each node id. Components are
+                numbered in order of their smallest node id
+        """
+        count = len(self._names)
+        parent = list(range(count))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for u, d in self.edges():
+            ru, rd = find(u), find(d)
+            if ru != rd:
+                if ru < rd:
+                    parent[rd] = ru
+                else:
+                    parent[ru] = rd
+
+        ret = array("i", [0]) * count
+        remap = {}
+        for i in range(count):
+            ret[i] = remap.setdefault(find(i), len(remap))
+        return ret
+
+
+class SubtreeHasher(object):
+    """Build canonical keys for groups of nodes so structurally identical
+    groups can be recognized, along with a node order that lines them up
+
+    Node labels are built bottom-up from the upstreams, Merkle style, and
+    interned to small ints in a table shared by every group. The key holds
+    the labels in canonical order plus every edge by canonical index, so two
+    groups only share a key if mapping one onto the other by canonical order
+    keeps all the node labels, edges, and edge labels the same
+    """
+
+    def __init__(self, graph, nodeLabel, edgeLabel):
+        """
+        Arguments:
+            graph (Graph): The graph the groups come from
+            nodeLabel (callable): Gets a hashable label for a node id, like
+                its node type and size
+            edgeLabel (callable): Gets a hashable label for an (upstream,
+                downstream) pair of ids, like the plugs that connect them
+        """
+        self._graph = graph
+        self._nodeLabel = nodeLabel
+        self._edgeLabel = edgeLabel
+        self._intern = {}
+
+    def _labels(self, members):
+        """Get the interned label of every member, computed from the upstreams"""
+        graph = self._graph
+        labels = {}
+        for root in members:
+            if root in labels:
+                continue
+            stack = [root]
+            while stack:
+                v = stack[-1]
+                pending = [u for u in graph.ups(v) if u in members and u not in labels]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                if v in labels:
+                    continue
+                ups = sorted(
+                    (self._edgeLabel(u, v), labels[u])
+                    for u in graph.ups(v)
+                    if u in members
+                )
+                lab = (self._nodeLabel(v), tuple(ups))
+                labels[v] = self._intern.setdefault(lab, len(self._intern))
+        return labels
+
+    def canonical(self, ids):
+        """Get the canonical key and node order of a group of node ids
+
+        Arguments:
+            ids (iterable): The node ids in the group
+
+        Returns:
+            tuple: A hashable key, or None if the group contains a cycle
+            list: The ids in canonical order
+        """
+        graph = self._graph
+        members = set(ids)
+        if any(graph.cycle(i) for i in members):
+            return None, sorted(members)
+
+        labels = self._labels(members)
+        roots = [i for i in members if not any(d in members for d in graph.downs(i))]
+        roots.sort(key=lambda i: labels[i])
+
+        order = []
+        index = {}
+        stack = roots[::-1]
+        while stack:
+            v = stack.pop()
+            if v in index:
+                continue
+            index[v] = len(order)
+            order.append(v)
+            ups = [u for u in graph.ups(v) if u in members]
+            ups.sort(key=lambda u: (self._edgeLabel(u, v), labels[u]), reverse=True)
+            stack.extend(ups)
+
+        edges = sorted(
+            (index[u], index[d], self._edgeLabel(u, d))
+            for d in order
+            for u in graph.ups(d)
+            if u in members
+        )
+        key = (tuple(labels[v] for v in order), tuple(edges))
+        return key, order
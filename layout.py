@@ -0,0 +1,805 @@
+"""Pure layout algorithms for the node editor
+
+Everything in here works on plain python data keyed by node, so it has no
+Maya or Qt dependency and can be run and profiled anywhere
+"""
+from bisect import bisect_left
+import math
+import time
+
+
+def isotonic(targets, weights):
+    """Weighted isotonic regression with the pool-adjacent-violators algorithm
+
+    Find the non-decreasing sequence closest to the targets in the weighted
+    least-squares sense
+
+    Arguments:
+        targets (list): The values to fit
+        weights (list): The positive weight of each value
+
+    Returns:
+        list: The fitted non-decreasing values
+    """
+    # Each block is [mean, totalWeight, count]
+    blocks = []
+    for t, w in zip(targets, weights):
+        blocks.append([t, w, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            m2, w2, c2 = blocks.pop()
+            m1, w1, c1 = blocks[-1]
+            tw = w1 + w2
+            blocks[-1] = [(m1 * w1 + m2 * w2) / tw, tw, c1 + c2]
+
+    ret = []
+    for m, _, c in blocks:
+        ret.extend([m] * c)
+    return ret
+
+
+def gapClusters(values, gap, maxSpan=None):
+    """Split 1D values into clusters wherever neighbouring sorted values are
+    more than `gap` apart
+
+    On dense values every neighbour can be closer than `gap`, which chains
+    everything into one cluster. `maxSpan` stops that by also starting a new
+    cluster once one would reach further than that from its first value
+
+    Arguments:
+        values (list): The values to cluster
+        gap (float): The smallest distance that separates two clusters
+        maxSpan (float, optional): The furthest apart two values in the same
+            cluster can be
+
+    Returns:
+        list: Lists of indices into `values`, one per cluster, ordered by value
+    """
+    order = sorted(range(len(values)), key=values.__getitem__)
+    clusters = []
+    prev = start = None
+    for i in order:
+        v = values[i]
+        if (
+            prev is None
+            or v - prev > gap
+            or (maxSpan is not None and v - start > maxSpan)
+        ):
+            clusters.append([])
+            start = v
+        clusters[-1].append(i)
+        prev = v
+    return clusters
+
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def gridPositions(rects, hSpacing=50.0, vSpacing=25.0, tolerance=0.5):
+    """Snap a messy group of boxes into a tidy grid of rows and columns
+
+    The box centers are clustered into rows and columns by the gaps between
+    them, and no row or column spans more than about one box, so a dense
+    messy selection can't chain into a single row or column. Then each row
+    and column is packed against its neighbours, with boxes aligned to the
+    top of their row and the left of their column. Boxes that land in the
+    same grid cell are stacked inside it
+
+    Arguments:
+        rects (list): (x, y, width, height) tuples
+        hSpacing (float): The gap between columns
+        vSpacing (float): The gap between rows
+        tolerance (float): How far apart, as a fraction of the median box
+            size, centers have to be to start a new row or column
+
+    Returns:
+        list: The new (x, y) of each rect
+    """
+    if not rects:
+        return []
+    cxs = [x + w / 2.0 for x, y, w, h in rects]
+    cys = [y + h / 2.0 for x, y, w, h in rects]
+    width = _median([r[2] for r in rects])
+    height = _median([r[3] for r in rects])
+    cols = gapClusters(cxs, tolerance * width, maxSpan=width)
+    rows = gapClusters(cys, tolerance * height, maxSpan=height)
+
+    colOf = [0] * len(rects)
+    for c, members in enumerate(cols):
+        for i in members:
+            colOf[i] = c
+    rowOf = [0] * len(rects)
+    for r, members in enumerate(rows):
+        for i in members:
+            rowOf[i] = r
+
+    # Stack anything that shares a cell, keeping the original top-to-bottom order
+    cells = {}
+    for i in sorted(range(len(rects)), key=cys.__getitem__):
+        cells.setdefault((rowOf[i], colOf[i]), []).append(i)
+    cellOffset = [0.0] * len(rects)
+    colWidth = [0.0] * len(cols)
+    rowHeight = [0.0] * len(rows)
+    for (r, c), members in cells.items():
+        h = 0.0
+        for i in members:
+            cellOffset[i] = h
+            h += rects[i][3] + vSpacing
+            colWidth[c] = max(colWidth[c], rects[i][2])
+        rowHeight[r] = max(rowHeight[r], h - vSpacing)
+
+    colLeft = []
+    x = min(r[0] for r in rects)
+    for w in colWidth:
+        colLeft.append(x)
+        x += w + hSpacing
+    rowTop = []
+    y = min(r[1] for r in rects)
+    for h in rowHeight:
+        rowTop.append(y)
+        y += h + vSpacing
+
+    return [
+        (colLeft[colOf[i]], rowTop[rowOf[i]] + cellOffset[i]) for i in range(len(rects))
+    ]
+
+
+# Affine transforms are (a, b, c, d, e, f) tuples, mapping
+#     x' = a * x + b * y + c
+#     y' = d * x + e * y + f
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+
+
+def composeAffine(*matrices):
+    """Combine affine transforms, applying them in the order given"""
+    ret = IDENTITY
+    for m in matrices:
+        a, b, c, d, e, f = ret
+        ma, mb, mc, md, me, mf = m
+        ret = (
+            ma * a + mb * d,
+            ma * b + mb * e,
+            ma * c + mb * f + mc,
+            md * a + me * d,
+            md * b + me * e,
+            md * c + me * f + mf,
+        )
+    return ret
+
+
+def aroundPivot(matrix, pivot):
+    """Make a linear transform act around the given (x, y) pivot"""
+    px, py = pivot
+    return composeAffine(
+        (1.0, 0.0, -px, 0.0, 1.0, -py), matrix, (1.0, 0.0, px, 0.0, 1.0, py)
+    )
+
+
+def translateAffine(dx, dy):
+    return (1.0, 0.0, dx, 0.0, 1.0, dy)
+
+
+def scaleAffine(sx, sy, pivot=(0.0, 0.0)):
+    return aroundPivot((sx, 0.0, 0.0, 0.0, sy, 0.0), pivot)
+
+
+def mirrorAffine(axis, pivot=(0.0, 0.0)):
+    """Mirror across the vertical ("x") or horizontal ("y") line through the pivot"""
+    if axis == "x":
+        return scaleAffine(-1.0, 1.0, pivot)
+    if axis == "y":
+        return scaleAffine(1.0, -1.0, pivot)
+    raise ValueError("Unknown mirror axis: {0}".format(axis))
+
+
+def rotateAffine(quarterTurns, pivot=(0.0, 0.0)):
+    """Rotate clockwise on screen by a number of 90 degree turns"""
+    cos, sin = [(1.0, 0.0), (0.0, 1.0), (-1.0, 0.0), (0.0, -1.0)][quarterTurns % 4]
+    # Scene Y points down, so this is clockwise on screen
+    return aroundPivot((cos, -sin, 0.0, sin, cos, 0.0), pivot)
+
+
+def transposeAffine(pivot=(0.0, 0.0)):
+    """Swap rows and columns by mirroring across the diagonal through the pivot"""
+    return aroundPivot((0.0, 1.0, 0.0, 1.0, 0.0, 0.0), pivot)
+
+
+def boundsCenter(rects):
+    """Get the center of the bounding box of some (x, y, width, height) rects"""
+    left = min(r[0] for r in rects)
+    top = min(r[1] for r in rects)
+    right = max(r[0] + r[2] for r in rects)
+    bottom = max(r[1] + r[3] for r in rects)
+    return (left + right) / 2.0, (top + bottom) / 2.0
+
+
+def swapsAxes(matrix):
+    """Check if an affine transform turns rows into columns, like a quarter
+    turn or a transpose does
+    """
+    a, b, c, d, e, f = matrix
+    return abs(b) > abs(a)
+
+
+def transformRects(rects, matrix, spacing=20.0):
+    """Move boxes by an affine transform of their centers
+
+    The boxes themselves stay upright and keep their size. When the transform
+    swaps the axes, the spacing that fit the box heights now has to fit their
+    widths, so boxes that end up overlapping are pushed apart horizontally,
+    keeping their order, and the result is centered where the transform put
+    it. That keeps it correct for boxes of different sizes
+
+    Arguments:
+        rects (list): (x, y, width, height) tuples
+        matrix (tuple): The affine transform
+        spacing (float): The gap to leave between boxes that get pushed apart
+
+    Returns:
+        list: The new (x, y) top-left corner of each rect
+    """
+    a, b, c, d, e, f = matrix
+    ret = []
+    for x, y, w, h in rects:
+        cx = x + w / 2.0
+        cy = y + h / 2.0
+        ret.append((a * cx + b * cy + c - w / 2.0, d * cx + e * cy + f - h / 2.0))
+    if not rects or not swapsAxes(matrix):
+        return ret
+
+    moved = {i: (x, y, r[2], r[3]) for i, ((x, y), r) in enumerate(zip(ret, rects))}
+    spread = spreadRects(moved, spacing)
+    cx, cy = boundsCenter(list(moved.values()))
+    sx, sy = boundsCenter(list(spread.values()))
+    return [(spread[i][0] + cx - sx, spread[i][1]) for i in range(len(rects))]
+
+
+def layerBoxes(graph, sizes, hSpacing=100.0, vSpacing=50.0):
+    """Lay out a graph of boxes in right-to-left layers
+
+    Sinks go in the rightmost layer, and everything else goes one layer to
+    the left of its furthest downstream, so cycles are placed as one unit.
+    Each layer is ordered by the average position of its downstreams
+
+    Arguments:
+        graph (Graph): The graph to lay out
+        sizes (dict): {nodeName: (width, height)}
+        hSpacing (float): The horizontal gap between layers
+        vSpacing (float): The vertical gap between boxes in a layer
+
+    Returns:
+        dict: {nodeName: (x, y)} of the top-left corner of each box
+    """
+    compOf, comps = graph.strongComponents()
+    # Components come after all their downstreams, so one pass is enough
+    compLayer = [0] * len(comps)
+    for c, members in enumerate(comps):
+        deepest = -1
+        for v in members:
+            for d in graph.downs(v):
+                oc = compOf[d]
+                if oc != c and compLayer[oc] > deepest:
+                    deepest = compLayer[oc]
+        compLayer[c] = deepest + 1
+
+    layers = {}
+    for v in range(len(graph)):
+        layers.setdefault(compLayer[compOf[v]], []).append(v)
+
+    centers = {}
+    ret = {}
+    right = 0.0
+    for li in sorted(layers):
+        layer = layers[li]
+
+        def barycenter(v):
+            ys = [centers[d] for d in graph.downs(v) if d in centers]
+            return sum(ys) / len(ys) if ys else float("inf")
+
+        layer.sort(key=lambda v: (barycenter(v), v))
+        width = max(sizes[graph.name(v)][0] for v in layer)
+        x = right - width
+        y = 0.0
+        for v in layer:
+            w, h = sizes[graph.name(v)]
+            ret[graph.name(v)] = (x + width - w, y)
+            centers[v] = y + h / 2.0
+            y += h + vSpacing
+        right = x - hSpacing
+
+    # Shift everything so the layout starts at the origin
+    if ret:
+        left = min(x for x, y in ret.values())
+        ret = {k: (x - left, y) for k, (x, y) in ret.items()}
+    return ret
+
+
+def straightenLayers(
+    layers,
+    heights,
+    edges,
+    initial,
+    spacing=50.0,
+    iterations=60,
+    tolerance=0.5,
+    anchorWeight=1e-3,
+):
+    """Solve for the node Y values that make the plug edges as horizontal
+    as possible while keeping the nodes in each layer in order without overlap
+
+    This minimizes sum((plugY[src] - plugY[dst]) ** 2) over all the edges
+    subject to y[next] >= y[prev] + heights[prev] + spacing inside each layer.
+    That's a convex quadratic program whose constraints only tie together
+    nodes in the same layer, so it's solved by block coordinate descent:
+    With every other layer held still, the best positions for one layer are
+    a weighted isotonic regression, which pool-adjacent-violators solves
+    exactly in linear time. Sweeping back and forth over the layers converges
+    to the global optimum
+
+    Arguments:
+        layers (list): Lists of nodes. Each layer is ordered top to bottom
+        heights (dict): {node: height}
+        edges (list): (src, srcPlugOffset, dst, dstPlugOffset) tuples. The plug
+            offsets are measured from the top of their node
+        initial (dict): {node: y} starting positions. Nodes are weakly
+            anchored to these, which also keeps unconnected nodes in place
+        spacing (float): The minimum vertical gap between nodes in a layer
+        iterations (int): The max number of sweeps over the layers
+        tolerance (float): Stop once no node moves more than this in a sweep
+        anchorWeight (float): How strongly nodes are held near `initial`
+
+    Returns:
+        dict: {node: y}
+    """
+    y = dict(initial)
+    adj = {n: [] for layer in layers for n in layer}
+    for src, srcOff, dst, dstOff in edges:
+        if src == dst or src not in adj or dst not in adj:
+            continue
+        # plugY[src] == plugY[dst]  <=>  y[src] == y[dst] + dstOff - srcOff
+        adj[src].append((dst, dstOff - srcOff))
+        adj[dst].append((src, srcOff - dstOff))
+
+    # The per-layer constant parts of the problem
+    prepared = []
+    for layer in layers:
+        offsets, weights = [], []
+        c = 0.0
+        for n in layer:
+            offsets.append(c)
+            weights.append(anchorWeight + len(adj[n]))
+            c += heights[n] + spacing
+        prepared.append((layer, offsets, weights))
+
+    forward = list(range(len(layers)))
+    backward = forward[::-1]
+    for it in range(iterations):
+        maxMove = 0.0
+        for li in forward if it % 2 == 0 else backward:
+            layer, offsets, weights = prepared[li]
+            # Substituting z = y - offset turns the no-overlap constraints
+            # into z being non-decreasing
+            targets = []
+            for n, c, w in zip(layer, offsets, weights):
+                t = anchorWeight * initial[n]
+                for m, off in adj[n]:
+                    t += y[m] + off
+                targets.append(t / w - c)
+            for n, c, z in zip(layer, offsets, isotonic(targets, weights)):
+                ny = z + c
+                move = abs(ny - y[n])
+                if move > maxMove:
+                    maxMove = move
+                y[n] = ny
+        if maxMove < tolerance:
+            break
+    return y
+
+
+class _Quad(object):
+    """A Barnes-Hut quadtree cell"""
+
+    __slots__ = ("x0", "y0", "size", "mass", "mx", "my", "children", "point")
+
+    def __init__(self, x0, y0, size):
+        self.x0 = x0
+        self.y0 = y0
+        self.size = size
+        self.mass = 0
+        self.mx = 0.0
+        self.my = 0.0
+        self.children = None
+        self.point = None
+
+
+def _buildQuadTree(
+    xs, ys, indices, deadline=None, clock=time.perf_counter, maxDepth=24
+):
+    """Build a quadtree over some of the points, with every cell storing the
+    total mass and the summed position of the points inside it. Points stop
+    being added once the deadline passes
+
+    Returns:
+        _Quad: The root cell, or None if there are no points
+    """
+    if not indices:
+        return None
+    x0 = min(xs[i] for i in indices)
+    x1 = max(xs[i] for i in indices)
+    y0 = min(ys[i] for i in indices)
+    y1 = max(ys[i] for i in indices)
+    size = max(x1 - x0, y1 - y0, 1.0)
+    root = _Quad(x0, y0, size)
+    for count, i in enumerate(indices):
+        if deadline is not None and count % 256 == 0:
+            if clock() > deadline:
+                break
+        x, y = xs[i], ys[i]
+        cell = root
+        depth = 0
+        while True:
+            cell.mx += x
+            cell.my += y
+            cell.mass += 1
+            if cell.children is None:
+                if cell.point is None and cell.mass == 1:
+                    cell.point = i
+                    break
+                if depth >= maxDepth:
+                    # Coincident points just share the cell
+                    break
+                # Split the leaf, and push its point down one level
+                half = cell.size / 2.0
+                cell.children = [
+                    _Quad(cell.x0, cell.y0, half),
+                    _Quad(cell.x0 + half, cell.y0, half),
+                    _Quad(cell.x0, cell.y0 + half, half),
+                    _Quad(cell.x0 + half, cell.y0 + half, half),
+                ]
+                old = cell.point
+                cell.point = None
+                if old is not None:
+                    ox, oy = xs[old], ys[old]
+                    q = (ox >= cell.x0 + half) + 2 * (oy >= cell.y0 + half)
+                    child = cell.children[q]
+                    child.mx, child.my, child.mass, child.point = ox, oy, 1, old
+            half = cell.size / 2.0
+            q = (x >= cell.x0 + half) + 2 * (y >= cell.y0 + half)
+            cell = cell.children[q]
+            depth += 1
+    return root
+
+
+def _repulsion(roots, i, x, y, k2, theta):
+    """Get the Fruchterman-Reingold repulsion on point i from the whole of
+    each of the trees
+    """
+    fx, fy = 0.0, 0.0
+    stack = [r for r in roots if r is not None]
+    while stack:
+        cell = stack.pop()
+        if not cell.mass or cell.point == i:
+            continue
+        dx = x - cell.mx / cell.mass
+        dy = y - cell.my / cell.mass
+        d2 = dx * dx + dy * dy
+        if cell.children is not None and cell.size * cell.size >= theta * theta * d2:
+            # Too close to treat as one mass, so look inside
+            stack.extend(cell.children)
+            continue
+        if d2 < 1e-6:
+            # Nudge points that are right on top of each other apart
+            dx, dy, d2 = 1e-3 * ((i % 7) - 3 or 1), 1e-3 * ((i % 5) - 2 or 1), 1e-5
+        f = k2 * cell.mass / d2
+        fx += dx * f
+        fy += dy * f
+    return fx, fy
+
+
+def forceDirected(
+    positions,
+    edges,
+    movable,
+    idealLength=150.0,
+    timeBudget=0.1,
+    iterations=100,
+    theta=0.8,
+    clock=time.perf_counter,
+):
+    """Refine node positions with a Fruchterman-Reingold spring embedder
+
+    The repulsion between every pair of nodes is approximated with
+    Barnes-Hut quadtrees. The fixed nodes go in a tree that's only built once,
+    and only the tree of the movable nodes is rebuilt every iteration, so an
+    iteration is O(M log N) for M movable nodes. Every node pushes on the
+    others, but only the movable ones are moved
+
+    The time budget is checked while the trees are built and while the
+    forces are summed, and an iteration that wouldn't fit in what's left of
+    it isn't started. The fixed tree gets at most half the budget, and the
+    fixed nodes nearest the movable ones go in first, so when there are too
+    many to fit it holds the ones that push the hardest. If an iteration runs
+    out of time, only the nodes whose forces were summed move
+
+    Arguments:
+        positions (dict): {node: (x, y)} of the node centers
+        edges (list): (node, node) pairs that pull on each other
+        movable (iterable): The nodes that are allowed to move
+        idealLength (float): The natural edge length
+        timeBudget (float): Stop after this many seconds, even if there are
+            iterations left
+        iterations (int): The max number of iterations
+        theta (float): The Barnes-Hut opening angle. Lower is more accurate
+        clock (callable): Gets the current time in seconds
+
+    Returns:
+        dict: {node: (x, y)} with the new positions of the movable nodes
+    """
+    deadline = clock() + timeBudget
+    keys = list(positions.keys())
+    index = {n: i for i, n in enumerate(keys)}
+    xs = [positions[n][0] for n in keys]
+    ys = [positions[n][1] for n in keys]
+    moving = [index[n] for n in movable if n in index]
+    if not moving:
+        return {}
+    links = [(index[a], index[b]) for a, b in edges if a in index and b in index]
+
+    k = float(idealLength)
+    k2 = k * k
+    # Start hot enough to move a node about one edge length per step
+    temp = k
+    cool = temp / max(iterations, 1)
+    isMoving = set(moving)
+    cx = sum(xs[i] for i in moving) / len(moving)
+    cy = sum(ys[i] for i in moving) / len(moving)
+    fixed = [i for i in range(len(keys)) if i not in isMoving]
+    fixed.sort(key=lambda i: (xs[i] - cx) ** 2 + (ys[i] - cy) ** 2)
+    now = clock()
+    fixedRoot = _buildQuadTree(
+        xs, ys, fixed, deadline=now + (deadline - now) / 2, clock=clock
+    )
+
+    slowest = 0.0
+    for _ in range(iterations):
+        start = clock()
+        if start + slowest > deadline:
+            break
+        roots = (fixedRoot, _buildQuadTree(xs, ys, moving, deadline, clock))
+        if clock() > deadline:
+            break
+        # Sum the cheap spring forces first, so running out of time while
+        # summing the repulsion leaves as little as possible to do after
+        disp = {i: [0.0, 0.0] for i in moving}
+        for a, b in links:
+            dx = xs[a] - xs[b]
+            dy = ys[a] - ys[b]
+            d = math.sqrt(dx * dx + dy * dy) or 1e-3
+            f = d / k
+            if a in isMoving:
+                disp[a][0] -= dx * f
+                disp[a][1] -= dy * f
+            if b in isMoving:
+                disp[b][0] += dx * f
+                disp[b][1] += dy * f
+        done = len(moving)
+        for count, i in enumerate(moving):
+            if count % 16 == 0 and clock() > deadline:
+                done = count
+                break
+            fx, fy = _repulsion(roots, i, xs[i], ys[i], k2, theta)
+            disp[i][0] += fx
+            disp[i][1] += fy
+        for i in moving[:done]:
+            dx, dy = disp[i]
+            d = math.sqrt(dx * dx + dy * dy)
+            if d > 0:
+                step = min(d, temp) / d
+                xs[i] += dx * step
+                ys[i] += dy * step
+        temp = max(temp - cool, 1.0)
+        if done < len(moving):
+            break
+        slowest = max(slowest, clock() - start)
+
+    return {keys[i]: (xs[i], ys[i]) for i in moving}
+
+
+def boundsArea(rects):
+    """Get the area of the bounding box of some (x, y, width, height) rects"""
+    if not rects:
+        return 0.0
+    left = min(r[0] for r in rects)
+    top = min(r[1] for r in rects)
+    right = max(r[0] + r[2] for r in rects)
+    bottom = max(r[1] + r[3] for r in rects)
+    return (right - left) * (bottom - top)
+
+
+_NEG_INF = float("-inf")
+
+
+class _Skyline(object):
+    """A segment tree over intervals of one axis that holds the furthest
+    edge placed so far over each interval
+
+    Both raising an interval and getting the max over an interval take
+    O(log n). Each node keeps the max raise applied to its whole range, and
+    the max of anything inside its range
+    """
+
+    def __init__(self, coords):
+        self.coords = coords
+        size = 1
+        while size < max(len(coords) - 1, 1):
+            size *= 2
+        self._size = size
+        self._tag = [_NEG_INF] * (2 * size)
+        self._best = [_NEG_INF] * (2 * size)
+
+    def _span(self, lo, hi):
+        """Get the leaf range of the elementary intervals inside [lo, hi)"""
+        return bisect_left(self.coords, lo), bisect_left(self.coords, hi)
+
+    def raiseTo(self, lo, hi, value):
+        tag, best = self._tag, self._best
+        l, r = self._span(lo, hi)
+        if l >= r:
+            return
+        l += self._size
+        r += self._size
+        edges = (l >> 1, (r - 1) >> 1)
+        while l < r:
+            if l & 1:
+                tag[l] = max(tag[l], value)
+                best[l] = max(best[l], value)
+                l += 1
+            if r & 1:
+                r -= 1
+                tag[r] = max(tag[r], value)
+                best[r] = max(best[r], value)
+            l >>= 1
+            r >>= 1
+        for i in edges:
+            while i:
+                best[i] = max(best[i], value)
+                i >>= 1
+
+    def query(self, lo, hi):
+        tag, best = self._tag, self._best
+        ret = _NEG_INF
+        l, r = self._span(lo, hi)
+        if l >= r:
+            return ret
+        l += self._size
+        r += self._size
+        edges = (l >> 1, (r - 1) >> 1)
+        while l < r:
+            if l & 1:
+                ret = max(ret, best[l])
+                l += 1
+            if r & 1:
+                r -= 1
+                ret = max(ret, best[r])
+            l >>= 1
+            r >>= 1
+        for i in edges:
+            while i:
+                ret = max(ret, tag[i])
+                i >>= 1
+        return ret
+
+
+def spreadRects(rects, gap, crossGap=0.0, axis=0):
+    """Push overlapping boxes apart along an axis, keeping their order
+
+    The boxes are placed in order along the axis, and each one only moves
+    far enough to clear the boxes before it that it overlaps across the
+    axis, using the same skyline as compactRects
+
+    Arguments:
+        rects (dict): {key: (x, y, width, height)}
+        gap (float): The space to leave between boxes that get pushed apart
+        crossGap (float): Boxes closer than this across the axis still count
+            as overlapping
+        axis (int): 0 to push along x, 1 along y
+
+    Returns:
+        dict: {key: (x, y, width, height)} with the new positions
+    """
+    if not rects:
+        return {}
+    p = 0 if axis == 0 else 1
+    q = 1 - p
+    half = crossGap / 2.0
+    coords = set()
+    for r in rects.values():
+        coords.add(r[q] - half)
+        coords.add(r[q] + r[q + 2] + half)
+    skyline = _Skyline(sorted(coords))
+
+    ret = {}
+    for k in sorted(rects, key=lambda k: (rects[k][p], str(k))):
+        r = list(rects[k])
+        lo, hi = r[q] - half, r[q] + r[q + 2] + half
+        r[p] = max(r[p], skyline.query(lo, hi) + gap)
+        skyline.raiseTo(lo, hi, r[p] + r[p + 2])
+        ret[k] = tuple(r)
+    return ret
+
+
+def compactRects(rects, gap, crossGap=0.0, axis=0, groups=None, edges=()):
+    """Slide boxes toward the start of an axis as far as they can go without
+    overlapping or changing their order
+
+    This is the longest path through the constraint graph that has an edge
+    wherever one box is before another along the axis and they overlap
+    across it. The boxes are placed in order along the axis, and instead of
+    building every edge, a skyline of the far edges placed so far across the
+    axis gives the longest path into each box in O(log n), so the whole pass
+    is O(n log n)
+
+    Arguments:
+        rects (dict): {key: (x, y, width, height)}
+        gap (float): The space to keep between boxes along the axis
+        crossGap (float): Boxes closer than this across the axis still count
+            as overlapping, so they can't slide past each other
+        axis (int): 0 to compact along x, 1 along y
+        groups (dict, optional): {key: groupKey}. Boxes in the same group move
+            together. Groups shouldn't be interleaved along the axis
+        edges (iterable): (beforeKey, afterKey) pairs that have to stay at
+            least `gap` apart in that order along the axis, even if they don't
+            overlap. Pairs that aren't in that order to begin with are ignored
+
+    Returns:
+        dict: {key: (x, y, width, height)} with the compacted positions
+    """
+    if not rects:
+        return {}
+    p = 0 if axis == 0 else 1
+    q = 1 - p
+    half = crossGap / 2.0
+
+    members = {}
+    for k in rects:
+        g = k if groups is None else groups.get(k, k)
+        members.setdefault(g, []).append(k)
+    groupStart = {g: min(rects[k][p] for k in ks) for g, ks in members.items()}
+    order = sorted(members, key=lambda g: (groupStart[g], str(g)))
+
+    preds = {}
+    for a, b in edges:
+        if a in rects and b in rects and rects[a][p] < rects[b][p]:
+            preds.setdefault(b, []).append(a)
+
+    coords = set()
+    for r in rects.values():
+        coords.add(r[q] - half)
+        coords.add(r[q] + r[q + 2] + half)
+    skyline = _Skyline(sorted(coords))
+
+    start = min(groupStart.values())
+    placed = {}
+    for g in order:
+        ks = members[g]
+        offset = start - groupStart[g]
+        for k in ks:
+            r = rects[k]
+            lo, hi = r[q] - half, r[q] + r[q + 2] + half
+            offset = max(offset, skyline.query(lo, hi) + gap - r[p])
+            for a in preds.get(k, ()):
+                if a in placed:
+                    offset = max(offset, placed[a] + rects[a][p + 2] + gap - r[p])
+        for k in ks:
+            r = rects[k]
+            placed[k] = r[p] + offset
+            skyline.raiseTo(r[q] - half, r[q] + r[q + 2] + half, placed[k] + r[p + 2])
+
+    ret = {}
+    for k, r in rects.items():
+        r = list(r)
+        r[p] = placed[k]
+        ret[k] = tuple(r)
+    return ret
@@ -0,0 +1,221 @@
+"""Layout quality measures that don't need Maya
+
+These work on the {nodeName: (x, y, w, h)} dicts that
+NodeEditorUI.getCurrentState returns, and the {nodeName: [upstreams]} dicts
+from NodeEditorUI.getStreams, so any two layouts of the same graph can be
+compared. Edges are drawn as straight lines from the middle of the right side
+of the upstream node to the middle of the left side of the downstream node
+"""
+from bisect import bisect_left
+import math
+
+
+def countInversions(values):
+    """Count the pairs i < j where values[i] > values[j] with a bottom-up
+    merge sort in O(n log n). Equal values don't count
+    """
+    arr = list(values)
+    count = len(arr)
+    buf = [None] * count
+    inversions = 0
+    width = 1
+    while width < count:
+        for lo in range(0, count, 2 * width):
+            mid = min(lo + width, count)
+            hi = min(lo + 2 * width, count)
+            i, j, k = lo, mid, lo
+            while i < mid and j < hi:
+                if arr[j] < arr[i]:
+                    buf[k] = arr[j]
+                    j += 1
+                    inversions += mid - i
+                else:
+                    buf[k] = arr[i]
+                    i += 1
+                k += 1
+            buf[k : k + mid - i] = arr[i:mid]
+            k += mid - i
+            buf[k:hi] = arr[j:hi]
+        arr, buf = buf, arr
+        width *= 2
+    return inversions
+
+
+def edgeSegments(state, ups):
+    """Get the straight line of each edge between two nodes in the state
+
+    Arguments:
+        state (dict): {nodeName: (x, y, w, h)}
+        ups (dict): {nodeName: [upstreamName, ...]}
+
+    Returns:
+        list: (x1, y1, x2, y2) tuples from the upstream to the downstream
+    """
+    ret = []
+    for d, us in ups.items():
+        dr = state.get(d)
+        if dr is None:
+            continue
+        dx, dy = dr[0], dr[1] + dr[3] / 2.0
+        for u in us:
+            ur = state.get(u)
+            if ur is not None:
+                ret.append((ur[0] + ur[2], ur[1] + ur[3] / 2.0, dx, dy))
+    return ret
+
+
+def countCrossings(segments):
+    """Count the pairs of segments that cross each other
+
+    The x axis is cut into slabs at every segment end. Inside a slab no
+    segment starts or stops, so two segments cross in it exactly when their
+    order at the left side of the slab is the reverse of their order at the
+    right side, and the crossings are the inversions between the two orders.
+    Segments that cross right on a slab boundary tie there on both sides, so
+    they're counted separately, once, at the left side of the slab after it
+
+    Every segment is sorted again in each slab it spans, so this takes
+    O(S log S) where S is the summed number of segments over all the slabs.
+    For a layered layout with aligned layers each edge spans one slab, and
+    that's the usual O(E log E) bilayer count
+
+    Only crossings inside both segments count. Segments that share an end or
+    touch at one, that overlap along a line, or that are vertical, don't
+
+    Arguments:
+        segments (list): (x1, y1, x2, y2) tuples
+
+    Returns:
+        int: The number of crossings
+    """
+    segs = []
+    for x1, y1, x2, y2 in segments:
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        if x1 < x2:
+            segs.append((x1, y1, x2, y2))
+    if len(segs) < 2:
+        return 0
+
+    xs = sorted(set(s[0] for s in segs) | set(s[2] for s in segs))
+    starts = [[] for _ in xs]
+    for s in segs:
+        starts[bisect_left(xs, s[0])].append(s)
+
+    crossings = 0
+    active = []
+    for k in range(len(xs) - 1):
+        left, right = xs[k], xs[k + 1]
+        active = [s for s in active if s[2] > left]
+        # The segments that go through the left side, keyed by their y there
+        through = {}
+        ends = []
+        for x1, y1, x2, y2 in active:
+            t = (y2 - y1) / (x2 - x1)
+            yl = y1 + t * (left - x1)
+            yr = y2 if right == x2 else y1 + t * (right - x1)
+            ends.append((yl, yr))
+            through.setdefault(yl, []).append(yr)
+        for x1, y1, x2, y2 in starts[k]:
+            # Use the real ends where they fall on the slab, so segments that
+            # share an end tie there exactly instead of within rounding error
+            t = (y2 - y1) / (x2 - x1)
+            ends.append((y1, y2 if right == x2 else y1 + t * (right - x1)))
+        active.extend(starts[k])
+
+        # Segments through the same point on the boundary cross there, unless
+        # they're on the same line
+        for yrs in through.values():
+            if len(yrs) > 1:
+                crossings += _pairs(len(yrs))
+                counts = {}
+                for yr in yrs:
+                    counts[yr] = counts.get(yr, 0) + 1
+                crossings -= sum(_pairs(c) for c in counts.values())
+
+        if len(ends) > 1:
+            ends.sort()
+            crossings += countInversions([r for _, r in ends])
+    return crossings
+
+
+def _pairs(count):
+    return count * (count - 1) // 2
+
+
+def countOverlaps(state):
+    """Count the pairs of node rects that overlap by more than a shared edge
+
+    The rects are hashed into a grid of cells about the size of an average
+    node, and only rects that share a cell are compared. Each pair is only
+    counted in the first cell the two rects share
+    """
+    rects = list(state.values())
+    if len(rects) < 2:
+        return 0
+    size = sum(max(r[2], r[3]) for r in rects) / len(rects)
+    size = size if size > 0 else 1.0
+
+    spans, cells = [], {}
+    for idx, (x, y, w, h) in enumerate(rects):
+        span = (
+            int(math.floor(x / size)),
+            int(math.floor(y / size)),
+            int(math.floor((x + w) / size)),
+            int(math.floor((y + h) / size)),
+        )
+        spans.append(span)
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cells.setdefault((cx, cy), []).append(idx)
+
+    overlaps = 0
+    for cell, members in cells.items():
+        for a in range(len(members)):
+            i = members[a]
+            x, y, w, h = rects[i]
+            for j in members[a + 1 :]:
+                ox, oy, ow, oh = rects[j]
+                if not (ox < x + w and x < ox + ow and oy < y + h and y < oy + oh):
+                    continue
+                first = (max(spans[i][0], spans[j][0]), max(spans[i][1], spans[j][1]))
+                if first == cell:
+                    overlaps += 1
+    return overlaps
+
+
+def layoutMetrics(state, ups):
+    """Measure how readable a layout is
+
+    Arguments:
+        state (dict): {nodeName: (x, y, w, h)} from getCurrentState
+        ups (dict): {nodeName: [upstreamName, ...]} from getStreams
+
+    Returns:
+        dict: With the keys
+            "nodes": The number of nodes
+            "edges": The number of edges between the nodes
+            "crossings": The number of edge crossings
+            "totalEdgeLength": The summed length of the edges
+            "maxEdgeLength": The longest edge
+            "area": The area of the bounding box of all the nodes
+            "overlaps": The number of pairs of overlapping nodes
+    """
+    segments = edgeSegments(state, ups)
+    lengths = [math.hypot(x2 - x1, y2 - y1) for x1, y1, x2, y2 in segments]
+    area = 0.0
+    if state:
+        left = min(r[0] for r in state.values())
+        top = min(r[1] for r in state.values())
+        right = max(r[0] + r[2] for r in state.values())
+        bottom = max(r[1] + r[3] for r in state.values())
+        area = (right - left) * (bottom - top)
+    return {
+        "nodes": len(state),
+        "edges": len(segments),
+        "crossings": countCrossings(segments),
+        "totalEdgeLength": sum(lengths),
+        "maxEdgeLength": max(lengths) if lengths else 0.0,
+        "area": area,
+        "overlaps": countOverlaps(state),
+    }
@@ -0,0 +1,172 @@
+"""Batched node name resolution with a cache of MObjectHandles keyed by UUID
+
+Names are resolved in bulk with a single MSelectionList, and the results stay
+valid until maya tells us a node was renamed, reparented, or deleted
+"""
+from .utils import lazyImport
+
+om = lazyImport("maya.OpenMaya")
+
+
+class NodeResolver(object):
+    """Resolve node names to MObjects, caching the handles by node UUID"""
+
+    def __init__(self):
+        self._uuids = {}  # {name: uuid}
+        self._names = {}  # {uuid: set(names)}
+        self._handles = {}  # {uuid: MObjectHandle}
+        self._callbacks = []
+
+    def _install(self):
+        """Register the callbacks that invalidate the cache"""
+        if self._callbacks:
+            return
+        self._callbacks = [
+            om.MNodeMessage.addNameChangedCallback(om.MObject(), self._onRenamed),
+            om.MDGMessage.addNodeRemovedCallback(self._onRemoved, "dependNode"),
+            om.MDagMessage.addAllDagChangesCallback(self._onDagChanged),
+        ]
+
+    def clear(self):
+        """Remove the callbacks and forget everything that was cached"""
+        for cb in self._callbacks:
+            om.MMessage.removeCallback(cb)
+        self._callbacks = []
+        self._uuids = {}
+        self._names = {}
+        self._handles = {}
+
+    @staticmethod
+    def _uuid(mobj):
+        return om.MFnDependencyNode(mobj).uuid().asString()
+
+    def _forget(self, uuid):
+        """Drop the names of the given uuid, and any DAG paths underneath them"""
+        names = self._names.pop(uuid, set())
+        prefixes = tuple(n + "|" for n in names if n.startswith("|"))
+        if prefixes:
+            names |= set(n for n in self._uuids if n.startswith(prefixes))
+        for n in names:
+            other = self._uuids.pop(n, None)
+            if other is not None and other != uuid:
+                self._names.get(other, set()).discard(n)
+
+    def _onRenamed(self, node, prevName, clientData):
+        self._forget(self._uuid(node))
+
+    def _onDagChanged(self, msgType, child, parent, clientData):
+        self._forget(self._uuid(child.node()))
+
+    def _onRemoved(self, node, clientData):
+        uuid = self._uuid(node)
+        self._forget(uuid)
+        self._handles.pop(uuid, None)
+
+    def _cached(self, name):
+        uuid = self._uuids.get(name)
+        if uuid is None:
+            return None
+        handle = self._handles.get(uuid)
+        if handle is None or not handle.isValid():
+            return None
+        return handle.object()
+
+    def resolve(self, names):
+        """Resolve a group of node names at once
+
+        Arguments:
+            names (list): The node names to resolve
+
+        Returns:
+            dict: {name: MObject}. Names that don't resolve to exactly one
+                node are left out
+        """
+        self._install()
+        ret = {}
+        missing = []
+        for name in names:
+            mobj = self._cached(name)
+            if mobj is None:
+                missing.append(name)
+            else:
+                ret[name] = mobj
+
+        if not missing:
+            return ret
+
+        # Fill one selection list with every uncached name, keeping track of
+        # which index each name landed on. Bad or ambiguous names are skipped
+        sl = om.MSelectionList()
+        added = []
+        for name in missing:
+            count = sl.length()
+            try:
+                sl.add(str(name))
+            except Exception:
+                continue
+            if sl.length() == count + 1:
+                added.append((count, name))
+
+        for idx, name in added:
+            mobj = om.MObject()
+            sl.getDependNode(idx, mobj)
+            uuid = self._uuid(mobj)
+            self._uuids[name] = uuid
+            self._names.setdefault(uuid, set()).add(name)
+            self._handles[uuid] = om.MObjectHandle(mobj)
+            ret[name] = mobj
+        return ret
+
+    def getNode(self, name):
+        """Get the MObject for a single node name, or None"""
+        return self.resolve([name]).get(name)
+
+    def getDepNode(self, name):
+        """Get an MFnDependencyNode for a single node name, or None"""
+        mobj = self.getNode(name)
+        if mobj is None:
+            return None
+        return om.MFnDependencyNode(mobj)
+
+    def getPlug(self, plugName):
+        """Get the MPlug for a "node.attr" style plug name, or None
+
+        The node goes through the cache. Plug paths with indices or children
+        fall back to a selection list lookup
+        """
+        nodeName, attrName = plugName.split(".", 1)
+        mobj = self.getNode(nodeName)
+        if mobj is None:
+            return None
+        if "." not in attrName and "[" not in attrName:
+            fn = om.MFnDependencyNode(mobj)
+            if fn.hasAttribute(attrName):
+                return fn.findPlug(attrName, False)
+
+        sl = om.MSelectionList()
+        try:
+            sl.add(str(plugName))
+        except Exception:
+            return None
+        plug = om.MPlug()
+        sl.getPlug(0, plug)
+        return plug
+
+
+_RESOLVER = None
+
+
+def getResolver():
+    """Get the shared NodeResolver"""
+    global _RESOLVER
+    if _RESOLVER is None:
+        _RESOLVER = NodeResolver()
+    return _RESOLVER
+
+
+def _teardown():
+    """Remove the resolver callbacks before this module is unloaded"""
+    global _RESOLVER
+    if _RESOLVER is not None:
+        _RESOLVER.clear()
+        _RESOLVER = None
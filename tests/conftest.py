@@ -0,0 +1,19 @@
+"""Make the checkout importable as the mayaAlignNodes package, whatever the
+folder it's in is called. Only the pure modules and replayed editors are
+tested, so none of this needs maya
+"""
+import importlib.util
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "mayaAlignNodes" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        "mayaAlignNodes",
+        os.path.join(_ROOT, "__init__.py"),
+        submodule_search_locations=[_ROOT],
+    )
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules["mayaAlignNodes"] = _module
+    _spec.loader.exec_module(_module)
@@ -0,0 +1,40 @@
+from mayaAlignNodes.bench import streamsCapture
+from mayaAlignNodes.capture import ReplayEditorUI
+
+
+def cycleCapture():
+    """A chain into a sink, a cycle that feeds a sink, and a cycle that
+    doesn't lead to any sink, like a transform and its constraint. Every
+    node starts out at the origin
+    """
+    ups = {
+        "chainEnd": ["chainMid"],
+        "chainMid": ["chainStart"],
+        "chainStart": [],
+        "loopA": ["loopB"],
+        "loopB": ["loopA"],
+        "loopSink": ["loopA"],
+        "xform": ["constraint"],
+        "constraint": ["xform"],
+    }
+    data = streamsCapture(ups, lambda n: "transform")
+    data["rects"] = [[0.0, 0.0, w, h] for x, y, w, h in data["rects"]]
+    return data
+
+
+def overlaps(nui):
+    rects = [i.sceneBoundingRect() for i in nui.nodeObjects.values()]
+    rects = [(r.x(), r.y(), r.width(), r.height()) for r in rects]
+    count = 0
+    for i, (x, y, w, h) in enumerate(rects):
+        for ox, oy, ow, oh in rects[i + 1 :]:
+            if ox < x + w and x < ox + ow and oy < y + h and y < oy + oh:
+                count += 1
+    return count
+
+
+def test_layoutPlacesCycles():
+    for kwargs in ({}, {"compact": True}, {"groupBy": "namespace"}):
+        nui = ReplayEditorUI(cycleCapture())
+        nui.layout(**kwargs)
+        assert overlaps(nui) == 0, kwargs
@@ -0,0 +1,119 @@
+import random
+
+from mayaAlignNodes.graph import Graph, SubtreeHasher
+
+
+def randomGraph(seed, count=30, edgeCount=45):
+    rng = random.Random(seed)
+    names = ["n{0:02d}".format(i) for i in range(count)]
+    edges = [(rng.choice(names), rng.choice(names)) for _ in range(edgeCount)]
+    edges = [(u, d) for u, d in edges if u != d]
+    return names, edges
+
+
+def reach(start, nexts):
+    """Get everything reachable from start, not counting start itself unless
+    it's in a cycle"""
+    seen, stack = set(), list(nexts.get(start, ()))
+    while stack:
+        n = stack.pop()
+        if n not in seen:
+            seen.add(n)
+            stack.extend(nexts.get(n, ()))
+    return seen
+
+
+def test_streams():
+    for seed in range(20):
+        names, edges = randomGraph(seed)
+        graph = Graph(names, edges + [("n00", "missing")])
+        ups = {n: sorted(set(u for u, d in edges if d == n)) for n in names}
+        downs = {n: sorted(set(d for u, d in edges if u == n)) for n in names}
+        assert graph.upsDict() == ups
+        assert graph.downsDict() == downs
+        assert graph.edgeCount == len(set(edges))
+        assert "missing" not in graph
+
+
+def test_reachAndCycles():
+    for seed in range(20):
+        names, edges = randomGraph(seed)
+        graph = Graph(names, edges)
+        downs = graph.downsDict()
+        ups = graph.upsDict()
+        for n in names:
+            i = graph.index(n)
+            fullDowns = reach(n, downs)
+            fullDowns.discard(n)
+            fullUps = reach(n, ups)
+            fullUps.discard(n)
+            assert set(graph.toNames(graph.fullDowns(i))) - {n} == fullDowns
+            assert set(graph.toNames(graph.fullUps(i))) - {n} == fullUps
+            cycle = set(graph.toNames(graph.cycle(i))) - {n}
+            assert cycle == fullDowns & fullUps
+
+
+def test_components():
+    for seed in range(20):
+        names, edges = randomGraph(seed, edgeCount=20)
+        graph = Graph(names, edges)
+        comps = graph.components()
+        both = {n: set() for n in names}
+        for u, d in edges:
+            both[u].add(d)
+            both[d].add(u)
+        for n in names:
+            connected = reach(n, both) | {n}
+            comp = comps[graph.index(n)]
+            same = set(m for m in names if comps[graph.index(m)] == comp)
+            assert same == connected
+
+
+def test_subgraph():
+    names, edges = randomGraph(5)
+    graph = Graph(names, edges)
+    keep = names[::2]
+    sub = graph.subgraph(graph.toIds(keep))
+    expected = Graph(keep, edges)
+    assert sub.upsDict() == expected.upsDict()
+
+
+def test_subtreeHasher():
+    # Two copies of one network, named in a different order, one with the
+    # deepest node under the other input, a cycle, and a lone chain
+    plugs = {}
+    edges = []
+    for prefix, deep in (("a", "1"), ("b", "1"), ("c", "2")):
+        for u, d, plug in (("1", "0", "input1"), ("2", "0", "input2")):
+            edges.append((prefix + u, prefix + d))
+            plugs[prefix + u, prefix + d] = plug
+        edges.append((prefix + "3", prefix + deep))
+        plugs[prefix + "3", prefix + deep] = "input1"
+    edges += [("d0", "d1"), ("d1", "d0"), ("e1", "e0")]
+    plugs["e1", "e0"] = "input1"
+    names = sorted(set(n for e in edges for n in e))
+    names = names[4:8][::-1] + names[:4] + names[8:]
+    graph = Graph(names, edges)
+
+    def edgeLabel(u, d):
+        return plugs.get(tuple(graph.toNames((u, d))))
+
+    hasher = SubtreeHasher(graph, lambda i: "node", edgeLabel)
+
+    def canonical(group):
+        return hasher.canonical(graph.toIds(group.split()))
+
+    keyA, orderA = canonical("a0 a1 a2 a3")
+    keyB, orderB = canonical("b3 b2 b1 b0")
+    keyC, orderC = canonical("c0 c1 c2 c3")
+    assert keyA is not None and keyA == keyB
+    assert keyC != keyA
+
+    # Lining the copies up by canonical order maps every edge onto an edge
+    mapping = dict(zip(graph.toNames(orderA), graph.toNames(orderB)))
+    assert mapping == {"a0": "b0", "a1": "b1", "a2": "b2", "a3": "b3"}
+
+    # Any group can be hashed, like a subtree of a bigger network
+    assert canonical("a1 a3")[0] == canonical("e0 e1")[0]
+    assert canonical("a0 a1")[0] != canonical("a0 a2")[0]
+    assert canonical("d0 d1")[0] is None
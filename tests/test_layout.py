@@ -0,0 +1,315 @@
+import random
+
+from mayaAlignNodes.layout import (
+    IDENTITY,
+    boundsArea,
+    boundsCenter,
+    compactRects,
+    composeAffine,
+    forceDirected,
+    gapClusters,
+    gridPositions,
+    isotonic,
+    mirrorAffine,
+    rotateAffine,
+    scaleAffine,
+    spreadRects,
+    straightenLayers,
+    transformRects,
+    transposeAffine,
+)
+
+
+def bruteCompact(rects, gap, crossGap, axis):
+    """Place each box after every earlier box it overlaps across the axis,
+    checking every pair"""
+    p, q = axis, 1 - axis
+    order = sorted(rects, key=lambda k: (rects[k][p], str(k)))
+    start = min(r[p] for r in rects.values())
+    placed = {}
+    for i, k in enumerate(order):
+        r = rects[k]
+        pos = start
+        for a in order[:i]:
+            o = rects[a]
+            if o[q] - crossGap < r[q] + r[q + 2] and r[q] - crossGap < o[q] + o[q + 2]:
+                pos = max(pos, placed[a] + o[p + 2] + gap)
+        placed[k] = pos
+    return placed
+
+
+def randomRects(rng, count):
+    return {
+        i: (
+            rng.randint(0, 500),
+            rng.randint(0, 500),
+            rng.randint(10, 80),
+            rng.randint(10, 40),
+        )
+        for i in range(count)
+    }
+
+
+def test_compactRects_bruteForce():
+    rng = random.Random(0)
+    for _ in range(200):
+        rects = randomRects(rng, rng.randint(1, 25))
+        axis = rng.randint(0, 1)
+        gap, crossGap = rng.choice([0, 5]), rng.choice([0, 10])
+        ret = compactRects(rects, gap, crossGap, axis=axis)
+        expected = bruteCompact(rects, gap, crossGap, axis)
+        for k, r in ret.items():
+            assert r[axis] == expected[k]
+            assert r[1 - axis] == rects[k][1 - axis]
+
+
+def test_compactRects_groups():
+    # Two stacked groups that interlock once they slide up together
+    rects = {
+        "a": (0, 0, 10, 100),
+        "b": (20, 0, 10, 10),
+        "c": (20, 200, 10, 10),
+        "d": (0, 200, 10, 10),
+    }
+    groups = {"a": 0, "b": 0, "c": 1, "d": 1}
+    ret = compactRects(rects, 10, axis=1, groups=groups)
+    # The group moves as far as its tightest box allows
+    assert ret["c"][1] - ret["d"][1] == 0
+    assert ret["d"][1] == 110
+    assert boundsArea(list(ret.values())) < boundsArea(list(rects.values()))
+
+
+def test_compactRects_edges():
+    # b doesn't overlap a, but the edge keeps it after a
+    rects = {"a": (0, 0, 50, 10), "b": (200, 100, 10, 10), "c": (300, 200, 10, 10)}
+    ret = compactRects(rects, 10, edges=[("a", "b"), ("c", "a")])
+    assert ret["b"][0] == 60
+    # Edges against the original order are ignored
+    assert ret["c"][0] == 0
+
+
+class FakeClock(object):
+    """A clock that moves on a fixed step every time it's read"""
+
+    def __init__(self, step):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def randomNodes(count, seed=0):
+    rng = random.Random(seed)
+    positions = {i: (rng.uniform(0, 1e4), rng.uniform(0, 1e4)) for i in range(count)}
+    edges = [(rng.randrange(count), rng.randrange(count)) for _ in range(count)]
+    return positions, edges
+
+
+def test_forceDirected_timeBudget():
+    positions, edges = randomNodes(3000)
+    for movable in (range(50), range(3000)):
+        clock = FakeClock(0.001)
+        ret = forceDirected(
+            positions, edges, movable, timeBudget=0.1, iterations=1000, clock=clock
+        )
+        # The deadline is checked often enough to stop within a few reads
+        assert clock.now <= 0.1 + 3 * clock.step
+        assert set(ret) == set(movable)
+
+
+def test_forceDirected_spreadsCoincidentNodes():
+    positions = {"a": (0.0, 0.0), "b": (0.0, 0.0), "fixed": (500.0, 0.0)}
+    clock = FakeClock(0.0)
+    ret = forceDirected(positions, [("a", "b")], ["a", "b"], clock=clock)
+    assert ret["a"] != ret["b"]
+    assert "fixed" not in ret
+
+
+def overlapping(positions, rects):
+    count = 0
+    for i in range(len(rects)):
+        (x, y), (_, _, w, h) = positions[i], rects[i]
+        for j in range(i + 1, len(rects)):
+            (ox, oy), (_, _, ow, oh) = positions[j], rects[j]
+            if ox < x + w and x < ox + ow and oy < y + h and y < oy + oh:
+                count += 1
+    return count
+
+
+def test_gapClusters():
+    assert gapClusters([0, 1, 2, 10, 11, 30], 5) == [[0, 1, 2], [3, 4], [5]]
+    # Close neighbours all the way along would chain into one cluster
+    values = [i * 3 for i in range(10)]
+    assert len(gapClusters(values, 5)) == 1
+    assert gapClusters(values, 5, maxSpan=10) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_gridPositions_jitteredGrid():
+    rng = random.Random(0)
+    rects = [
+        (c * 200 + rng.uniform(-10, 10), r * 80 + rng.uniform(-5, 5), 150, 40)
+        for r in range(5)
+        for c in range(4)
+    ]
+    positions = gridPositions(rects)
+    assert len(set(x for x, y in positions)) == 4
+    assert len(set(y for x, y in positions)) == 5
+    assert overlapping(positions, rects) == 0
+
+
+def test_gridPositions_randomSelection():
+    # Dense random boxes used to chain into one column hundreds of rows tall
+    rng = random.Random(1)
+    rects = [
+        (
+            rng.uniform(0, 3000),
+            rng.uniform(0, 3000),
+            rng.choice([120, 150, 200]),
+            rng.choice([40, 60, 90]),
+        )
+        for _ in range(300)
+    ]
+    positions = gridPositions(rects)
+    assert overlapping(positions, rects) == 0
+    right = max(p[0] + r[2] for p, r in zip(positions, rects))
+    bottom = max(p[1] + r[3] for p, r in zip(positions, rects))
+    width = right - min(x for x, y in positions)
+    height = bottom - min(y for x, y in positions)
+    assert len(set(x for x, y in positions)) > 5
+    assert height < 4 * width
+
+
+def applyAffine(matrix, point):
+    a, b, c, d, e, f = matrix
+    x, y = point
+    return a * x + b * y + c, d * x + e * y + f
+
+
+def assertSameAffine(m, n):
+    assert all(abs(p - q) < 1e-9 for p, q in zip(m, n))
+
+
+def test_affineHelpers():
+    pivot = (30.0, -20.0)
+    assertSameAffine(composeAffine(*[rotateAffine(1, pivot)] * 4), IDENTITY)
+    fullTurn = composeAffine(rotateAffine(1, pivot), rotateAffine(3, pivot))
+    assertSameAffine(fullTurn, IDENTITY)
+    assertSameAffine(composeAffine(*[transposeAffine(pivot)] * 2), IDENTITY)
+    assertSameAffine(composeAffine(*[mirrorAffine("y", pivot)] * 2), IDENTITY)
+    for m in (rotateAffine(1, pivot), transposeAffine(pivot), scaleAffine(2, 3, pivot)):
+        assert applyAffine(m, pivot) == pivot
+
+    # Scene Y points down, so a clockwise turn takes right to down
+    assertSameAffine(applyAffine(rotateAffine(1), (1, 0)), (0, 1))
+    assertSameAffine(applyAffine(transposeAffine(), (1, 2)), (2, 1))
+    assertSameAffine(applyAffine(mirrorAffine("x", pivot), (40, 5)), (20, 5))
+    # The first transform given is applied first
+    m = composeAffine(scaleAffine(2, 2), rotateAffine(1))
+    assertSameAffine(applyAffine(m, (1, 0)), (0, 2))
+
+
+def test_transformRectsKeepsSizes():
+    rects = [(0, 0, 150, 40), (300, 100, 80, 60)]
+    pos = transformRects(rects, mirrorAffine("x", boundsCenter(rects)))
+    assert pos == [(230, 0), (0, 100)]
+
+
+def test_transformRectsSpreadsSwappedAxes():
+    """A tidy column of wide nodes stays overlap free when turned into a row"""
+    rects = [(0, i * 60, 150, 40) for i in range(5)]
+    pivot = boundsCenter(rects)
+    turns = (rotateAffine(1, pivot), rotateAffine(3, pivot), transposeAffine(pivot))
+    for matrix in turns:
+        pos = transformRects(rects, matrix, spacing=20)
+        assert overlapping(pos, rects) == 0
+        assert len({y for x, y in pos}) == 1
+        xs = sorted(x for x, y in pos)
+        assert all(b - a == 170 for a, b in zip(xs, xs[1:]))
+        moved = [(x, y, 150, 40) for x, y in pos]
+        assert boundsCenter(moved) == pivot
+
+    # The row keeps the order the transform gave it
+    pos = transformRects(rects, transposeAffine(pivot))
+    assert pos == sorted(pos)
+    pos = transformRects(rects, rotateAffine(1, pivot))
+    assert pos == sorted(pos, reverse=True)
+
+
+def test_spreadRectsRandom():
+    rng = random.Random(7)
+    for _ in range(30):
+        rects = randomRects(rng, rng.randint(1, 25))
+        ret = spreadRects(rects, 10)
+        keys = list(rects)
+        pos = [ret[k][:2] for k in keys]
+        assert overlapping(pos, [rects[k] for k in keys]) == 0
+        for k in keys:
+            assert ret[k][1] == rects[k][1]
+            assert ret[k][0] >= rects[k][0]
+
+
+def test_isotonic():
+    assert isotonic([1, 2, 3], [1, 1, 1]) == [1, 2, 3]
+    assert isotonic([3, 1, 2], [1, 1, 1]) == [2, 2, 2]
+    assert isotonic([1, 3, 2], [1, 1, 3]) == [1, 2.25, 2.25]
+
+    rng = random.Random(3)
+    for _ in range(50):
+        count = rng.randint(1, 30)
+        targets = [rng.uniform(-100, 100) for _ in range(count)]
+        weights = [rng.uniform(0.1, 5) for _ in range(count)]
+        fit = isotonic(targets, weights)
+        assert len(fit) == count
+        assert all(a <= b for a, b in zip(fit, fit[1:]))
+
+        # Every run of equal values is the weighted mean of its targets
+        start = 0
+        for i in range(1, count + 1):
+            if i == count or fit[i] != fit[start]:
+                tw = sum(weights[start:i])
+                mean = sum(t * w for t, w in zip(targets[start:i], weights[start:i]))
+                assert abs(fit[start] - mean / tw) < 1e-9
+                start = i
+
+
+def randomLayers(rng, layerCount, perLayer, edgeCount):
+    layers, heights, initial = [], {}, {}
+    nid = 0
+    for _ in range(layerCount):
+        layer = list(range(nid, nid + rng.randint(1, perLayer)))
+        nid += len(layer)
+        y = rng.uniform(-100, 100)
+        for n in layer:
+            heights[n] = rng.choice([40.0, 80.0, 120.0])
+            initial[n] = y
+            y += heights[n] + rng.uniform(50, 150)
+        layers.append(layer)
+    edges = []
+    for _ in range(edgeCount):
+        li = rng.randint(1, layerCount - 1)
+        src, dst = rng.choice(layers[li]), rng.choice(layers[li - 1])
+        srcOff, dstOff = rng.uniform(0, heights[src]), rng.uniform(0, heights[dst])
+        edges.append((src, srcOff, dst, dstOff))
+    return layers, heights, edges, initial
+
+
+def test_straightenLayers():
+    # A single edge gets straight
+    layers, heights = [["a"], ["b"]], {"a": 40, "b": 40}
+    ys = straightenLayers(layers, heights, [("a", 10, "b", 30)], {"a": 0, "b": 0})
+    assert abs(ys["a"] + 10 - ys["b"] - 30) < 1
+
+    rng = random.Random(5)
+    for _ in range(20):
+        layers, heights, edges, initial = randomLayers(rng, 6, 6, 30)
+        ys = straightenLayers(layers, heights, edges, initial, spacing=50.0)
+        for layer in layers:
+            for prev, n in zip(layer, layer[1:]):
+                assert ys[n] >= ys[prev] + heights[prev] + 50.0 - 1e-6
+
+        def cost(y):
+            return sum((y[s] + so - y[d] - do) ** 2 for s, so, d, do in edges)
+
+        assert cost(ys) <= cost(initial) + 1e-6
@@ -0,0 +1,107 @@
+from fractions import Fraction
+import itertools
+import random
+
+from mayaAlignNodes.metrics import (
+    countCrossings,
+    countInversions,
+    countOverlaps,
+    layoutMetrics,
+)
+
+
+def bruteCrossings(segments):
+    """Count the pairs of segments that cross inside both of them"""
+    count = 0
+    for a, b in itertools.combinations(segments, 2):
+        if a[0] == a[2] or b[0] == b[2]:
+            continue
+        px, py = Fraction(a[0]), Fraction(a[1])
+        rx, ry = Fraction(a[2]) - px, Fraction(a[3]) - py
+        qx, qy = Fraction(b[0]), Fraction(b[1])
+        sx, sy = Fraction(b[2]) - qx, Fraction(b[3]) - qy
+        den = rx * sy - ry * sx
+        if den == 0:
+            continue
+        t = ((qx - px) * sy - (qy - py) * sx) / den
+        u = ((qx - px) * ry - (qy - py) * rx) / den
+        if 0 < t < 1 and 0 < u < 1:
+            count += 1
+    return count
+
+
+def bruteOverlaps(state):
+    count = 0
+    for (x, y, w, h), (ox, oy, ow, oh) in itertools.combinations(state.values(), 2):
+        if ox < x + w and x < ox + ow and oy < y + h and y < oy + oh:
+            count += 1
+    return count
+
+
+def test_countInversions():
+    rng = random.Random(0)
+    for _ in range(100):
+        values = [rng.randint(0, 10) for _ in range(rng.randint(0, 30))]
+        expected = sum(
+            1 for i, j in itertools.combinations(range(len(values)), 2)
+            if values[i] > values[j]
+        )
+        assert countInversions(values) == expected
+
+
+def test_countCrossings_onSlabBoundary():
+    cross = [(0, 0, 10, 10), (0, 10, 10, 0)]
+    assert countCrossings(cross) == 1
+    # An unrelated segment ending at x=5 puts a slab boundary on the crossing
+    assert countCrossings(cross + [(5, 100, 6, 100)]) == 1
+
+
+def test_countCrossings_sharedEnds():
+    assert countCrossings([(0, 0, 10, 0), (0, 0, 10, 10)]) == 0
+    assert countCrossings([(0, 0, 10, 5), (0, 10, 10, 5)]) == 0
+    # Touching the middle of another segment isn't crossing it
+    assert countCrossings([(0, 0, 10, 10), (5, 5, 10, 0)]) == 0
+    # Neither is running along it
+    assert countCrossings([(0, 0, 10, 10), (2, 2, 8, 8)]) == 0
+
+
+def test_countCrossings_bruteForceGrid():
+    # Small integer grids make lots of ties on the slab boundaries
+    rng = random.Random(1)
+    for _ in range(300):
+        segments = [
+            tuple(rng.randint(0, 10) for _ in range(4))
+            for _ in range(rng.randint(2, 25))
+        ]
+        assert countCrossings(segments) == bruteCrossings(segments)
+
+
+def test_countCrossings_bruteForceFloat():
+    rng = random.Random(2)
+    for _ in range(100):
+        segments = [
+            tuple(rng.uniform(0, 100) for _ in range(4))
+            for _ in range(rng.randint(2, 40))
+        ]
+        assert countCrossings(segments) == bruteCrossings(segments)
+
+
+def test_countOverlaps_bruteForce():
+    rng = random.Random(3)
+    for _ in range(100):
+        state = {
+            i: (rng.randint(0, 50), rng.randint(0, 50), rng.randint(1, 20), 10)
+            for i in range(rng.randint(0, 40))
+        }
+        assert countOverlaps(state) == bruteOverlaps(state)
+
+
+def test_layoutMetrics():
+    state = {"a": (0, 0, 10, 10), "b": (20, 0, 10, 10), "c": (20, 20, 10, 10)}
+    ret = layoutMetrics(state, {"b": ["a"], "c": ["a"]})
+    assert ret["nodes"] == 3
+    assert ret["edges"] == 2
+    assert ret["crossings"] == 0
+    assert ret["overlaps"] == 0
+    assert ret["area"] == 30 * 30
+    assert ret["maxEdgeLength"] > ret["totalEdgeLength"] / 2
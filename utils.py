@@ -1,7 +1,6 @@
 import os
 import sys
-from .Qt.QtCore import QObject, QTimer
-from .Qt.QtGui import QIcon
+import importlib
 
 
 def getUiFile(fileVar, subFolder="ui", uiName=None):
@@ -50,7 +49,8 @@ def clearPathSymbols(paths, keepers=None):
     keepers = keepers or []
     paths = [os.path.normcase(os.path.normpath(p)) for p in paths]
 
-    for key, value in sys.modules.items():
+    # Copy the items, because we pop from sys.modules as we go
+    for key, value in list(sys.modules.items()):
         protected = False
 
         # Used by multiprocessing library, don't remove this.
@@ -70,9 +70,9 @@ def clearPathSymbols(paths, keepers=None):
         if protected:
             continue
 
-        try:
-            packPath = value.__file__
-        except AttributeError:
+        # Builtins and namespace packages don't have a file
+        packPath = getattr(value, "__file__", None)
+        if not packPath:
             continue
 
         packPath = os.path.normcase(os.path.normpath(packPath))
@@ -80,3 +80,85 @@ def clearPathSymbols(paths, keepers=None):
         isEnvPackage = any(packPath.startswith(p) for p in paths)
         if isEnvPackage:
             sys.modules.pop(key)
+
+
+class LazyModule(object):
+    """A stand-in for a module that doesn't get imported until one of its
+    attributes is used
+
+    Each attribute is cached on this object the first time it's looked up,
+    so only the first access of a name goes through __getattr__
+
+    Parameters
+    ----------
+    name : str
+            The full name of the module to import
+    """
+
+    def __init__(self, name):
+        self.__dict__["_lazyName"] = name
+        self.__dict__["_lazyModule"] = None
+
+    def _load(self):
+        mod = self.__dict__["_lazyModule"]
+        if mod is None:
+            mod = importlib.import_module(self._lazyName)
+            self.__dict__["_lazyModule"] = mod
+        return mod
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self._lazyModule is not None else "not loaded"
+        return "<LazyModule {0!r} ({1})>".format(self._lazyName, state)
+
+
+def lazyImport(name):
+    """Get a stand-in for the given module that imports it on first use
+
+    Parameters
+    ----------
+    name : str
+            The full name of the module, like "maya.OpenMaya"
+
+    Returns
+    -------
+    LazyModule
+            The module stand-in
+
+    """
+    return LazyModule(name)
+
+
+def reloadPackage(keepers=None):
+    """Tear down and unload every module in this package, then import it again
+
+    Any loaded module in the package that defines a `_teardown` function has
+    it called first, so callbacks and event filters pointing at the old code
+    are removed before the modules go away
+
+    Parameters
+    ----------
+    keepers : list or None
+            List of module names that will not be removed (Default value = None)
+
+    Returns
+    -------
+    module
+            The freshly imported package
+
+    """
+    package = __name__.rpartition(".")[0]
+    prefix = package + "."
+    for key, mod in list(sys.modules.items()):
+        if key != package and not key.startswith(prefix):
+            continue
+        teardown = getattr(mod, "_teardown", None)
+        if teardown is not None:
+            teardown()
+
+    clearPathSymbols([os.path.dirname(os.path.abspath(__file__))], keepers=keepers)
+    return importlib.import_module(package)